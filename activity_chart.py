@@ -0,0 +1,163 @@
+import textwrap
+from threading import Thread, Condition
+import matplotlib
+matplotlib.rcParams['font.family'] = 'Yu Gothic'
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PySide6.QtCore import QObject, Signal
+from PySide6.QtGui import QImage
+from history import HistoryCache
+from rollup import RollupIndex
+from perfstats import STATS, now_ns
+
+# matplotlib の読み込みは重いので、グラフが初めて表示されるときに main から import される
+
+class BarChartRenderer:
+    # バーとラベルのアーティストを保持し、高さと位置だけを更新する。
+    # アプリの集合が変わったときだけ作り直して tight_layout を実行する。
+    def __init__(self, fig, axes):
+        self.fig = fig
+        self.axes = axes
+        self.names = ()
+        self.bars = []
+        self.texts = []
+        self.limit = None
+        self._wrapped = {}
+
+    def render(self, log_data, limit):
+        names = tuple(log_data)
+        minutes = [log_data[name] / 60 for name in names]
+        if len(names) != len(self.names) or set(names) != set(self.names):
+            self._rebuild(names, minutes, limit)
+            return True
+
+        for i, name in enumerate(names):
+            bar = self.bars[i]
+            text = self.texts[i]
+            if bar.get_height() != minutes[i]:
+                bar.set_height(minutes[i])
+                text.set_y(minutes[i] / 2)
+            if self.names[i] != name:
+                text.set_text(self._wrap(name))
+        self.names = names
+        if limit != self.limit:
+            self.axes.set_ylim(0, limit * 1.1)
+            self.limit = limit
+        return False
+
+    def _rebuild(self, names, minutes, limit):
+        self.axes.clear()
+        self.axes.set_ylim(0, limit * 1.1)
+        self.names = names
+        self.limit = limit
+        self.bars = []
+        self.texts = []
+        if not names:
+            return
+
+        self.bars = list(self.axes.bar(range(len(names)), minutes, color="lightgray"))
+        self.axes.set_ylabel("時間（分）")
+        self.axes.set_title("アプリ別アクティブ時間")
+        self.axes.set_xticks(range(len(names)))
+        self.axes.set_xticklabels(["" for _ in names])
+
+        for bar, name in zip(self.bars, names):
+            x = bar.get_x() + bar.get_width() / 2
+            y = bar.get_height() / 2
+            self.texts.append(self.axes.text(x, y, self._wrap(name), ha='center', va='center', fontsize=9, color='black'))
+
+        self.fig.tight_layout()
+
+    def _wrap(self, name):
+        wrapped = self._wrapped.get(name)
+        if wrapped is None:
+            wrapped = self._wrapped[name] = textwrap.fill(name, width=10)
+        return wrapped
+
+class ChartWorker(QObject):
+    # 集計と Agg でのラスタライズを専用スレッドで行い、完成した QImage だけを
+    # frame_ready で UI スレッドへ渡す。描画中に来た要求は最新の1件だけ残す。
+    frame_ready = Signal(object, object)
+
+    def __init__(self, log_dir="logs", past_totals=None):
+        super().__init__()
+        # history / rollups / Figure はこのスレッドだけが触る。
+        # past_totals(days) を渡すと過去分はそこから取る（--connect 時はデーモン）
+        self.history = HistoryCache(log_dir)
+        self.rollups = RollupIndex(log_dir)
+        self.past_totals = past_totals or self._local_past_totals
+        self.fig = Figure()
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.axes = self.fig.add_subplot(111)
+        self.chart = BarChartRenderer(self.fig, self.axes)
+        self._size = None
+        self._pending = None
+        self._last = None
+        self._running = True
+        self._cond = Condition()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, request):
+        # request = (range_mode, today_totals, limit, (width, height, dpr))
+        with self._cond:
+            self._pending = request
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                request, self._pending = self._pending, None
+            if request == self._last:
+                continue
+            try:
+                started = now_ns()
+                image = self._render(*request)
+                STATS.record("chart.render", now_ns() - started)
+            except Exception as e:
+                print(f"chart render failed: {e}")
+                continue
+            self._last = request
+            self.frame_ready.emit(image, request)
+
+    def _combined(self, range_mode, log_data):
+        # 過去分を加算（1ヶ月・1年は週次/月次ロールアップから）
+        if range_mode == "day":
+            return log_data
+        past = self.past_totals({"week": 6, "month": 29}.get(range_mode, 364))
+        combined = dict(log_data)
+        for k, v in past.items():
+            combined[k] = combined.get(k, 0) + v
+        return combined
+
+    def _local_past_totals(self, days):
+        if days <= 7:
+            return self.history.past_totals(days)
+        return self.rollups.past_totals(days)
+
+    def _render(self, range_mode, log_data, limit, size):
+        width, height, dpr = size
+        resized = size != self._size
+        if resized:
+            self.fig.set_dpi(100 * dpr)
+            self.fig.set_size_inches(width / 100, height / 100)
+            self._size = size
+        rebuilt = self.chart.render(self._combined(range_mode, dict(log_data)), limit)
+        if resized and not rebuilt and self.chart.names:
+            self.fig.tight_layout()
+        self.canvas.draw()
+        buffer = self.canvas.buffer_rgba()
+        h, w = buffer.shape[:2]
+        image = QImage(bytes(buffer), w, h, w * 4, QImage.Format_RGBA8888).copy()
+        image.setDevicePixelRatio(dpr)
+        return image
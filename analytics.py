@@ -0,0 +1,105 @@
+import argparse
+from datetime import date, timedelta
+import numpy as np
+from logger import Logger, read_day, available_days
+
+
+class ActivityMatrix:
+    # seconds[app, day] for a contiguous date range; all aggregations are
+    # whole-array NumPy operations.
+    def __init__(self, apps, days, seconds):
+        self.apps = apps
+        self.days = days
+        self.seconds = seconds
+
+    def totals(self):
+        return self.seconds.sum(axis=1)
+
+    def totals_dict(self):
+        return dict(zip(self.apps, self.totals().tolist()))
+
+    def daily_mean(self, active_days_only=False):
+        if not active_days_only:
+            return self.seconds.mean(axis=1) if self.days else np.zeros(len(self.apps))
+        active = (self.seconds > 0).sum(axis=1)
+        return np.divide(self.totals(), active, out=np.zeros(len(self.apps)), where=active > 0)
+
+    def goal_attainment(self, settings):
+        # settings: {app: target minutes per day}, as edited in SettingsDialog.
+        # Returns (share of days the goal was met, mean progress capped at 100%).
+        goals = np.array([settings.get(app, 0) * 60 for app in self.apps], dtype=np.float64)[:, None]
+        has_goal = goals > 0
+        progress = np.divide(self.seconds, goals, out=np.zeros_like(self.seconds), where=has_goal)
+        met = (progress >= 1).mean(axis=1) if self.days else np.zeros(len(self.apps))
+        mean_progress = np.minimum(progress, 1).mean(axis=1) if self.days else np.zeros(len(self.apps))
+        no_goal = ~has_goal[:, 0]
+        met[no_goal] = np.nan
+        mean_progress[no_goal] = np.nan
+        return met, mean_progress
+
+    def top_n(self, n, values=None):
+        values = self.totals() if values is None else values
+        n = min(n, len(values))
+        if n == 0:
+            return []
+        idx = np.argpartition(-values, n - 1)[:n]
+        idx = idx[np.argsort(-values[idx], kind="stable")]
+        return [(self.apps[i], float(values[i])) for i in idx]
+
+
+def load_matrix(log_dir, start, end, loader=None):
+    # loader(day) -> {app: seconds}; defaults to reading snapshot + journal
+    loader = loader or (lambda day: read_day(log_dir, day))
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    present = available_days(log_dir)
+
+    app_index = {}
+    rows, cols, values = [], [], []
+    for col, day in enumerate(days):
+        if str(day) not in present:
+            continue
+        data = loader(day)
+        rows.extend(app_index.setdefault(app, len(app_index)) for app in data)
+        cols.extend([col] * len(data))
+        values.extend(data.values())
+
+    seconds = np.zeros((len(app_index), len(days)))
+    if values:
+        np.add.at(seconds, (np.array(rows), np.array(cols)), np.array(values, dtype=np.float64))
+    return ActivityMatrix(list(app_index), days, seconds)
+
+
+def stack_layers(minutes, limit):
+    # Splits each bar into segments of at most `limit` minutes.
+    # Row k holds layer k of every bar (0 where a bar has fewer layers).
+    minutes = np.asarray(minutes, dtype=np.float64)
+    if not len(minutes):
+        return np.zeros((0, 0))
+    n_layers = np.maximum(1, np.ceil(minutes / limit)).astype(np.intp)
+    offsets = np.arange(n_layers.max())[:, None] * limit
+    return np.clip(minutes[None, :] - offsets, 0, limit)
+
+
+def top_layer(minutes, limit):
+    # height of the last (partially filled) layer of each bar
+    minutes = np.asarray(minutes, dtype=np.float64)
+    n_layers = np.maximum(1, np.ceil(minutes / limit))
+    return minutes - (n_layers - 1) * limit
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    end = date.today()
+    matrix = load_matrix(args.log_dir, end - timedelta(days=args.days - 1), end)
+    met, progress = matrix.goal_attainment(Logger().load_settings())
+    mean = matrix.daily_mean()
+    index = {app: i for i, app in enumerate(matrix.apps)}
+    for app, seconds in matrix.top_n(args.top):
+        i = index[app]
+        goal = "" if np.isnan(met[i]) else f"  goal met {met[i] * 100:5.1f}%"
+        print(f"{seconds / 3600:8.1f}h  {mean[i] / 60:6.1f}m/day{goal}  {app}")
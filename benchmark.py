@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+# Headless benchmarks for the tracker, logger, table and graph hot paths.
+#   python benchmark.py --quick --output bench.json
+#   python benchmark.py --baseline bench.json      # exit code 1 on regressions
+# Win32 calls are replaced by ReplayProbe; Qt runs on the offscreen platform.
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from logger import Logger
+from probe import ReplayProbe, synthetic_events
+from tracker import WindowTracker, Snapshot
+
+FULL = {
+    "apps": [10, 100, 1000, 5000],
+    "switches": [1000, 10000],
+    "history_days": [7, 365, 1095],
+}
+QUICK = {
+    "apps": [10, 1000],
+    "switches": [1000],
+    "history_days": [7, 365],
+}
+
+
+def measure(fn, repeat=5, setup=None):
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    times.sort()
+    return {
+        "mean_ms": statistics.fmean(times),
+        "p50_ms": times[len(times) // 2],
+        "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "runs": len(times),
+    }
+
+
+def app_names(n):
+    return [f"app{i:04d}.exe" for i in range(n)]
+
+
+def write_history(log_dir, apps, days, seed=0):
+    rng = random.Random(seed)
+    os.makedirs(log_dir, exist_ok=True)
+    today = date.today()
+    for i in range(1, days + 1):
+        day = today - timedelta(days=i)
+        data = {app: rng.random() * 3600 for app in rng.sample(apps, min(len(apps), 50))}
+        with open(os.path.join(log_dir, f"{day}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+def bench_tracker(workdir, n_apps, switches):
+    log_dir = os.path.join(workdir, "track")
+
+    def run():
+        events = synthetic_events(n_apps=n_apps, switches=switches, start=time.time())
+        tracker = WindowTracker(probe=ReplayProbe(events), logger=Logger(log_dir=log_dir))
+        tracker.track()
+
+    result = measure(run, repeat=3, setup=lambda: shutil.rmtree(log_dir, ignore_errors=True))
+    result["per_switch_us"] = result["mean_ms"] * 1000 / switches
+    return result
+
+
+def bench_logger(workdir, n_apps):
+    log_dir = os.path.join(workdir, "logger")
+    shutil.rmtree(log_dir, ignore_errors=True)
+    logger = Logger(log_dir=log_dir)
+    data = {app: float(i) for i, app in enumerate(app_names(n_apps))}
+    results = {
+        "save_log": measure(lambda: logger.save_log(data), repeat=20),
+        "append_log": measure(lambda: [logger.append_log("app0000.exe", 1.0) for _ in range(100)], repeat=20),
+    }
+    results["load_log"] = measure(logger.load_log, repeat=20)
+    logger.close()
+    return results
+
+
+class BenchTracker:
+    # Just the WindowTracker surface TrackerApp reads, driven by the benchmark.
+    def __init__(self, n_apps, seed=0):
+        self.rng = random.Random(seed)
+        self.apps = app_names(n_apps)
+        self.log = {app: self.rng.random() * 3600 for app in self.apps}
+        self.name_map = {}
+        self.version = 0
+        self.snapshot = None
+        self.publish()
+
+    def publish(self, changed=None):
+        self.version += 1
+        changes = ((self.version, changed),)
+        self.snapshot = Snapshot(self.version, dict(self.log), self.apps[0], time.monotonic(), changes)
+
+    def switch(self, count):
+        changed = set()
+        for _ in range(count):
+            app = self.rng.choice(self.apps)
+            self.log[app] += self.rng.random() * 120
+            changed.add(app)
+        self.publish(frozenset(changed))
+
+    def get_snapshot(self):
+        return self.snapshot
+
+    def get_log(self):
+        return self.snapshot.totals
+
+    def running_seconds(self, snapshot=None):
+        return time.monotonic() - self.snapshot.current_start
+
+    def get_name_map(self):
+        return self.name_map
+
+    def get_probe_stats(self):
+        return {}
+
+    def stop(self):
+        pass
+
+
+def qt_app():
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+def bench_update_table(n_apps, switches_per_tick):
+    app = qt_app()
+    from main import TrackerApp
+    tracker = BenchTracker(n_apps)
+    win = TrackerApp(tracker)
+    win.timer.stop()
+    win.show()
+    app.processEvents()
+
+    def tick():
+        win.update_table()
+        app.processEvents()
+
+    # the switches themselves happen on the tracker thread, outside the timing
+    result = measure(tick, repeat=30, setup=lambda: tracker.switch(switches_per_tick))
+    win.close()
+    return result
+
+
+def wait_for_frame(app, graph, frames, timeout=60):
+    # rendering happens on the chart worker thread; wait until its image is shown
+    deadline = time.perf_counter() + timeout
+    while graph.frames == frames and time.perf_counter() < deadline:
+        app.processEvents()
+        time.sleep(0.0005)
+
+
+def bench_update_graph(workdir, n_apps, history_days, range_mode):
+    app = qt_app()
+    from main import LogGraphWidget
+    log_dir = os.path.join(workdir, f"history-{n_apps}-{history_days}")
+    if not os.path.isdir(log_dir):
+        write_history(log_dir, app_names(n_apps), history_days)
+    graph = LogGraphWidget(log_dir=log_dir)
+    graph.range_mode = range_mode
+    graph.ui.show()
+    graph.toggle_button.setChecked(True)
+    rng = random.Random(1)
+    today = {app: rng.random() * 3600 for app in app_names(min(n_apps, 30))}
+    graph.update_graph(today)
+    wait_for_frame(app, graph, 0)
+
+    def tick():
+        key = rng.choice(list(today))
+        today[key] += 1
+        frames = graph.frames
+        graph.update_graph(today)
+        wait_for_frame(app, graph, frames)
+
+    result = measure(tick, repeat=20)
+    graph.shutdown()
+    graph.ui.close()
+    return result
+
+
+def bench_history(workdir, n_apps, history_days):
+    from analytics import load_matrix
+    log_dir = os.path.join(workdir, f"history-{n_apps}-{history_days}")
+    if not os.path.isdir(log_dir):
+        write_history(log_dir, app_names(n_apps), history_days)
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=history_days - 1)
+    return measure(lambda: load_matrix(log_dir, start, end).totals(), repeat=3)
+
+
+def run_suite(preset, only=None):
+    results = []
+    workdir = tempfile.mkdtemp(prefix="tracker-bench-")
+    cwd = os.getcwd()
+    # the tracker and dialogs read settings/display_names from the cwd
+    os.chdir(workdir)
+
+    def record(name, params, fn):
+        if only and not name.startswith(only):
+            return
+        print(f"{name} {params} ...", file=sys.stderr, flush=True)
+        result = fn()
+        if "mean_ms" not in result:
+            for sub, value in result.items():
+                results.append({"name": f"{name}.{sub}", "params": params, **value})
+        else:
+            results.append({"name": name, "params": params, **result})
+
+    try:
+        for n_apps in preset["apps"]:
+            for switches in preset["switches"]:
+                record("tracker.track", {"apps": n_apps, "switches": switches},
+                       lambda: bench_tracker(workdir, n_apps, switches))
+            record("logger", {"apps": n_apps}, lambda: bench_logger(workdir, n_apps))
+            for per_tick in (1, 10):
+                record("ui.update_table", {"apps": n_apps, "switches_per_tick": per_tick},
+                       lambda: bench_update_table(n_apps, per_tick))
+            for days in preset["history_days"]:
+                record("history.load_matrix", {"apps": n_apps, "days": days},
+                       lambda: bench_history(workdir, n_apps, days))
+                for mode in ("day", "week", "year"):
+                    record("ui.update_graph", {"apps": n_apps, "days": days, "range": mode},
+                           lambda: bench_update_graph(workdir, n_apps, days, mode))
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    def key(r):
+        return (r["name"], json.dumps(r["params"], sort_keys=True))
+    base = {key(r): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        b = base.get(key(r))
+        if b is None:
+            continue
+        ratio = r["p50_ms"] / b["p50_ms"] if b["p50_ms"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(r)
+        elif ratio < 1 - threshold:
+            flag = "  faster"
+        print(f"{r['name']:28s} {json.dumps(r['params']):60s} {b['p50_ms']:10.3f} -> {r['p50_ms']:10.3f} ms ({ratio:5.2f}x){flag}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--quick", action="store_true", help="smaller workload matrix")
+    parser.add_argument("--only", help="run benchmarks whose name starts with this")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed p50 slowdown (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    results = run_suite(QUICK if args.quick else FULL, args.only)
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "preset": "quick" if args.quick else "full",
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        sys.exit(1 if regressions else 0)
+    for r in results:
+        print(f"{r['name']:28s} {json.dumps(r['params']):60s} p50 {r['p50_ms']:10.3f} ms")
@@ -0,0 +1,162 @@
+import copy
+import json
+import os
+from threading import Thread, Condition
+from logger import atomic_write
+
+# Process-wide, in-memory copy of the JSON config files. Readers get the
+# current object without touching the disk (treat it as read-only); set()
+# swaps in a new value, notifies subscribers and leaves the write to a
+# background thread, which batches changes made within `write_delay` into one
+# atomic write per file and skips values that did not change. The same thread
+# stats the files every `poll_interval` seconds and reloads ones edited by
+# someone else (another process, a text editor).
+
+FILES = {
+    "settings": ("settings.json", dict),
+    "name_map": ("display_names.json", dict),
+    "display_flags": ("display_flags.json", dict),
+    "rules": ("display_rules.json", list),
+}
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _read(path, default):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default()
+    except (OSError, ValueError) as e:
+        print(f"config: cannot read {path}: {e}")
+        return None
+
+
+class ConfigStore:
+    def __init__(self, base_dir=".", write_delay=0.5, poll_interval=2.0):
+        self.paths = {key: os.path.join(base_dir, name) for key, (name, _) in FILES.items()}
+        self.write_delay = write_delay
+        self.poll_interval = poll_interval
+        self.writes = 0
+        self.reloads = 0
+        self._values = {}
+        self._signatures = {}
+        self._dirty = set()
+        self._subscribers = []
+        self._running = True
+        self._cond = Condition()
+        for key, (_, default) in FILES.items():
+            path = self.paths[key]
+            self._signatures[key] = _signature(path)
+            value = _read(path, default)
+            self._values[key] = value if value is not None else default()
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def get(self, key):
+        return self._values[key]
+
+    def set(self, key, value):
+        if value == self._values[key]:
+            return False
+        value = copy.deepcopy(value)
+        with self._cond:
+            self._values[key] = value
+            self._dirty.add(key)
+            self._cond.notify()
+        self._notify(key, value)
+        return True
+
+    def subscribe(self, callback):
+        # callback(key, value), called on the thread that made the change
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def flush(self):
+        with self._cond:
+            dirty, self._dirty = self._dirty, set()
+        for key in dirty:
+            self._write(key)
+
+    def close(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self._thread.join(timeout=5)
+        self.flush()
+
+    def _notify(self, key, value):
+        for callback in list(self._subscribers):
+            try:
+                callback(key, value)
+            except Exception as e:
+                print(f"config subscriber failed: {e}")
+
+    def _write(self, key):
+        raw = json.dumps(self._values[key], indent=2, ensure_ascii=False).encode("utf-8")
+        try:
+            atomic_write(self.paths[key], raw)
+        except OSError as e:
+            print(f"config: cannot write {self.paths[key]}: {e}")
+            with self._cond:
+                self._dirty.add(key)
+            return
+        # our own write must not come back as an external edit
+        self._signatures[key] = _signature(self.paths[key])
+        self.writes += 1
+
+    def _poll(self):
+        for key, (_, default) in FILES.items():
+            if key in self._dirty:
+                # a pending local change wins over the file
+                continue
+            signature = _signature(self.paths[key])
+            if signature == self._signatures[key]:
+                continue
+            self._signatures[key] = signature
+            value = _read(self.paths[key], default)
+            if value is None or value == self._values[key]:
+                continue
+            self._values[key] = value
+            self.reloads += 1
+            self._notify(key, value)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and not self._dirty:
+                    self._cond.wait(self.poll_interval)
+                if not self._running:
+                    return
+                pending = bool(self._dirty)
+            if pending:
+                # let a burst of set() calls land before writing once
+                with self._cond:
+                    self._cond.wait_for(lambda: not self._running, self.write_delay)
+                self.flush()
+            else:
+                self._poll()
+
+    def stats(self):
+        return {"writes": self.writes, "reloads": self.reloads}
+
+
+_shared = None
+
+
+def shared_store():
+    # the store used by WindowTracker and TrackerApp in this process
+    global _shared
+    if _shared is None:
+        _shared = ConfigStore()
+    return _shared
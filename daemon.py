@@ -0,0 +1,209 @@
+import argparse
+import asyncio
+import json
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread
+from types import MappingProxyType
+from history import HistoryCache
+from logger import Logger
+from probe import add_probe_arguments, probe_from_args
+from rollup import RollupIndex
+from tracker import WindowTracker, Snapshot
+
+# Headless tracker service. WindowTracker runs in its own thread exactly as in
+# the GUI; clients talk JSON lines over a loopback socket:
+#   {"cmd": "snapshot", "since": 12}  live totals (or just the running part if unchanged)
+#   {"cmd": "current"}                current app and its running seconds
+#   {"cmd": "range", "days": 7}       totals for today plus the previous days-1 days
+#                                     ("today": false leaves today out)
+#   {"cmd": "name_map"} / {"cmd": "set_name_map", "name_map": {...}}
+#   {"cmd": "rules"} / {"cmd": "set_rules", "rules": [...]}
+# Requests only read the tracker's published snapshot, so any number of
+# pollers cannot hold up the tracking loop.
+
+DEFAULT_PORT = 47800
+
+
+class TrackerService:
+    def __init__(self, tracker, log_dir="logs"):
+        self.tracker = tracker
+        self.history = HistoryCache(log_dir)
+        self.rollups = RollupIndex(log_dir)
+        # history and rollups are not thread-safe: one worker serializes them
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._encoded_version = None
+        self._encoded_totals = None
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self.dispatch(json.loads(line))
+                except Exception as e:
+                    response = json.dumps({"error": str(e)})
+                writer.write(response.encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        cmd = request.get("cmd")
+        snapshot = self.tracker.get_snapshot()
+        running = self.tracker.running_seconds(snapshot)
+        if cmd == "snapshot":
+            head = {"version": snapshot.version, "current_app": snapshot.current_app, "running": running}
+            if request.get("since") == snapshot.version:
+                return json.dumps(dict(head, unchanged=True), ensure_ascii=False)
+            # totals are encoded once per version, however many clients ask
+            return json.dumps(head, ensure_ascii=False)[:-1] + ', "totals": ' + self._totals_json(snapshot) + "}"
+        if cmd == "current":
+            return json.dumps({"app": snapshot.current_app, "running": running}, ensure_ascii=False)
+        if cmd == "range":
+            days = int(request.get("days", 7))
+            loop = asyncio.get_running_loop()
+            past = await loop.run_in_executor(self._executor, self._past_totals, days - 1)
+            totals = dict(past)
+            if request.get("today", True):
+                for app, seconds in self.tracker.live_totals(snapshot).items():
+                    totals[app] = totals.get(app, 0) + seconds
+            return json.dumps({"days": days, "totals": totals}, ensure_ascii=False)
+        if cmd == "name_map":
+            return json.dumps({"name_map": self.tracker.get_name_map()}, ensure_ascii=False)
+        if cmd == "set_name_map":
+            self.tracker.set_name_map(dict(request["name_map"]))
+            return json.dumps({"ok": True})
+        if cmd == "rules":
+            return json.dumps({"rules": self.tracker.get_rules()}, ensure_ascii=False)
+        if cmd == "set_rules":
+            self.tracker.set_rules(list(request["rules"]))
+            return json.dumps({"ok": True})
+        raise ValueError(f"unknown command: {cmd}")
+
+    def _totals_json(self, snapshot):
+        if self._encoded_version != snapshot.version:
+            self._encoded_totals = json.dumps(dict(snapshot.totals), ensure_ascii=False)
+            self._encoded_version = snapshot.version
+        return self._encoded_totals
+
+    def _past_totals(self, days):
+        if days <= 0:
+            return {}
+        if days <= 7:
+            return self.history.past_totals(days)
+        return self.rollups.past_totals(days)
+
+
+class TrackerClient:
+    # Stands in for WindowTracker in the GUI (python main.py --connect PORT).
+    # Blocking and single-threaded: it is only used from the Qt thread.
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, timeout=2.0):
+        self.host = host
+        self.port = port
+        self._sock = socket.create_connection((host, port), timeout=timeout)
+        self._file = self._sock.makefile("rwb")
+        self._snapshot = Snapshot(0, MappingProxyType({}), None, None)
+        self._name_map = self.request({"cmd": "name_map"})["name_map"]
+
+    def request(self, message):
+        try:
+            self._file.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+            self._file.flush()
+            line = self._file.readline()
+        except (OSError, ValueError) as e:
+            # ValueError: the connection was already closed after a failure
+            self.stop()
+            raise ConnectionError(f"tracker daemon unreachable: {e}") from e
+        if not line:
+            self.stop()
+            raise ConnectionError("tracker daemon closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    def get_snapshot(self):
+        response = self.request({"cmd": "snapshot", "since": self._snapshot.version})
+        totals = self._snapshot.totals if response.get("unchanged") else MappingProxyType(response["totals"])
+        current_start = time.monotonic() - response["running"] if response["current_app"] else None
+        self._snapshot = Snapshot(response["version"], totals, response["current_app"], current_start)
+        return self._snapshot
+
+    def changed_since(self, version):
+        return self.get_snapshot().version != version
+
+    def running_seconds(self, snapshot=None):
+        snapshot = snapshot or self._snapshot
+        if not snapshot.current_app:
+            return 0
+        return max(0, time.monotonic() - snapshot.current_start)
+
+    def get_log(self):
+        return self._snapshot.totals
+
+    def range_totals(self, days):
+        return self.request({"cmd": "range", "days": days})["totals"]
+
+    def past_totals(self, days):
+        # the `days` days before today, as ChartWorker's past_totals
+        return self.request({"cmd": "range", "days": days + 1, "today": False})["totals"]
+
+    def history_client(self):
+        # a second connection for the chart worker thread (this one belongs to
+        # the Qt thread); year rollups may take a while to build on first use
+        return TrackerClient(self.host, self.port, timeout=60.0)
+
+    def get_name_map(self):
+        return self._name_map
+
+    def set_name_map(self, new_map):
+        self.request({"cmd": "set_name_map", "name_map": new_map})
+        self._name_map = new_map
+
+    def get_rules(self):
+        return self.request({"cmd": "rules"})["rules"]
+
+    def set_rules(self, rules):
+        self.request({"cmd": "set_rules", "rules": rules})
+
+    def get_probe_stats(self):
+        # the probe lives in the daemon process
+        return {}
+
+    def stop(self):
+        # closing a thin client leaves the daemon running
+        self._file.close()
+        self._sock.close()
+
+
+def run(tracker, host="127.0.0.1", port=DEFAULT_PORT):
+    thread = Thread(target=tracker.track, daemon=True)
+    thread.start()
+    try:
+        asyncio.run(TrackerService(tracker, tracker.logger.log_dir).serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tracker.stop()
+        thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_probe_arguments(parser)
+    args = parser.parse_args()
+    probe = probe_from_args(parser, args)
+    run(WindowTracker(probe=probe, logger=Logger(log_dir=args.log_dir)), args.host, args.port)
@@ -0,0 +1,158 @@
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from logger import Logger, available_days
+
+# Streams the daily logs to a file without building the whole history in memory:
+#   python export.py --start 2024-01-01 --end 2024-12-31 --output 2024.csv
+#   python export.py --days 30 --output month.npz --display-names --respect-flags
+# Every format consumes the same (day, app, seconds) generator, one day at a time.
+
+FORMATS = ("csv", "npz", "arrow")
+CHUNK_ROWS = 65536
+
+
+def export_rows(logger, start, end, name_map=None, display_flags=None):
+    # display_flags hides apps by their logged name (the keys NameMapDialog
+    # shows); name_map renames, merging apps that share a display name in a day
+    for day, totals in logger.iter_days(start, end):
+        if display_flags is None and name_map is None:
+            for app, seconds in sorted(totals.items()):
+                yield day, app, seconds
+            continue
+        merged = {}
+        for app, seconds in totals.items():
+            if display_flags is not None and not display_flags.get(app, True):
+                continue
+            name = name_map.get(app, app) if name_map is not None else app
+            merged[name] = merged.get(name, 0) + seconds
+        for app, seconds in sorted(merged.items()):
+            yield day, app, seconds
+
+
+def write_csv(rows, path):
+    count = 0
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["date", "app", "seconds"])
+        for day, app, seconds in rows:
+            writer.writerow([day, app, round(seconds, 3)])
+            count += 1
+    return count
+
+
+def _chunks(rows, size=CHUNK_ROWS):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_npz(rows, path):
+    # Columns: date (datetime64[D]), app_id (int32), seconds (float64), plus the
+    # apps table that app_id indexes. Columns are spooled to temp files chunk by
+    # chunk and then copied into the zip as .npy members, so memory is bounded
+    # by the chunk size and the number of distinct apps.
+    import numpy as np
+    from numpy.lib import format as npy_format
+
+    dtypes = {"date": np.dtype("datetime64[D]"), "app_id": np.dtype("<i4"), "seconds": np.dtype("<f8")}
+    app_ids = {}
+    count = 0
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path))) as tmp:
+        spools = {name: open(os.path.join(tmp, name), "wb") for name in dtypes}
+        try:
+            for chunk in _chunks(rows):
+                days, apps, seconds = zip(*chunk)
+                ids = [app_ids.setdefault(app, len(app_ids)) for app in apps]
+                spools["date"].write(np.array(days, dtype=dtypes["date"]).tobytes())
+                spools["app_id"].write(np.array(ids, dtype=dtypes["app_id"]).tobytes())
+                spools["seconds"].write(np.array(seconds, dtype=dtypes["seconds"]).tobytes())
+                count += len(chunk)
+        finally:
+            for f in spools.values():
+                f.close()
+
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            for name, dtype in dtypes.items():
+                with zf.open(f"{name}.npy", "w", force_zip64=True) as member, \
+                        open(os.path.join(tmp, name), "rb") as src:
+                    header = {"descr": npy_format.dtype_to_descr(dtype), "fortran_order": False, "shape": (count,)}
+                    npy_format.write_array_header_1_0(member, header)
+                    while True:
+                        block = src.read(1 << 20)
+                        if not block:
+                            break
+                        member.write(block)
+            with zf.open("apps.npy", "w") as member:
+                np.save(member, np.array(list(app_ids), dtype=str))
+    return count
+
+
+def write_arrow(rows, path):
+    # Arrow IPC file; pyarrow is optional and only needed for this format
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise SystemExit("arrow 形式の出力には pyarrow が必要です (pip install pyarrow)")
+
+    schema = pa.schema([("date", pa.date32()), ("app", pa.dictionary(pa.int32(), pa.string())), ("seconds", pa.float64())])
+    # An IPC file allows one dictionary per field, extended only by deltas, so
+    # app ids come from one table that grows across batches (as in write_npz).
+    options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    app_ids = {}
+    count = 0
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, schema, options=options) as writer:
+        for chunk in _chunks(rows):
+            days, apps, seconds = zip(*chunk)
+            ids = pa.array([app_ids.setdefault(app, len(app_ids)) for app in apps], pa.int32())
+            batch = pa.record_batch([
+                pa.array([date.fromisoformat(d) for d in days], pa.date32()),
+                pa.DictionaryArray.from_arrays(ids, pa.array(list(app_ids), pa.string())),
+                pa.array(seconds, pa.float64()),
+            ], schema=schema)
+            writer.write_batch(batch)
+            count += len(chunk)
+    return count
+
+
+WRITERS = {"csv": write_csv, "npz": write_npz, "arrow": write_arrow}
+
+
+def export(logger, start, end, path, fmt=None, display_names=False, respect_flags=False):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower().replace("feather", "arrow")
+    if fmt not in WRITERS:
+        raise ValueError(f"unknown export format: {fmt}")
+    name_map = logger.load_name_map() if display_names else None
+    display_flags = logger.load_display_flags() if respect_flags else None
+    return WRITERS[fmt](export_rows(logger, start, end, name_map, display_flags), path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--start", type=date.fromisoformat, help="first day (default: oldest log)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day (default: today)")
+    parser.add_argument("--days", type=int, help="last N days instead of --start")
+    parser.add_argument("--output", required=True, help="*.csv, *.npz or *.arrow")
+    parser.add_argument("--format", choices=FORMATS)
+    parser.add_argument("--display-names", action="store_true", help="apply display_names.json")
+    parser.add_argument("--respect-flags", action="store_true", help="drop apps hidden in display_flags.json")
+    args = parser.parse_args()
+
+    end = args.end or date.today()
+    if args.days:
+        start = end - timedelta(days=args.days - 1)
+    else:
+        start = args.start or date.fromisoformat(min(available_days(args.log_dir), default=end.isoformat()))
+    logger = Logger(log_dir=args.log_dir)
+    count = export(logger, start, end, args.output, args.format, args.display_names, args.respect_flags)
+    print(f"{count} rows -> {args.output}", file=sys.stderr)
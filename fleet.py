@@ -0,0 +1,159 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from history import day_signature
+from logger import read_day, atomic_write, available_days
+from rollup import signature_json
+
+# Aggregates the logs/ directories collected from many workstations:
+#   python fleet.py //share/tracker/*/logs --jobs 8 --output fleet.json
+# Each root is one machine and is handled by one worker process. A worker
+# keeps a per-machine cache of day totals keyed by the day's file signature,
+# so a rerun only re-reads days whose snapshot or journal changed. Workers
+# return small per-machine summaries; the parent just adds them up.
+
+
+def machine_name(root):
+    root = os.path.normpath(root)
+    name = os.path.basename(root)
+    if name == "logs":
+        # //share/tracker/<machine>/logs
+        name = os.path.basename(os.path.dirname(root)) or name
+    return name
+
+
+def cache_path(cache_dir, root):
+    key = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def _load_cache(path, root):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # a hash collision or a moved root must not reuse someone else's totals
+    return cache["days"] if cache.get("root") == os.path.abspath(root) else {}
+
+
+def aggregate_machine(root, cache_dir=None, start=None, end=None):
+    # runs in a worker process; start/end are "YYYY-MM-DD" strings or None
+    cached = _load_cache(cache_path(cache_dir, root), root) if cache_dir else {}
+    days = {}
+    changed = 0
+    for day in sorted(available_days(root)):
+        signature = signature_json(day_signature(root, day))
+        entry = cached.get(day)
+        if entry is None or entry["signature"] != signature:
+            entry = {"signature": signature, "totals": read_day(root, day)}
+            changed += 1
+        days[day] = entry
+
+    if cache_dir and (changed or len(days) != len(cached)):
+        os.makedirs(cache_dir, exist_ok=True)
+        raw = json.dumps({"root": os.path.abspath(root), "days": days}, ensure_ascii=False)
+        atomic_write(cache_path(cache_dir, root), raw.encode("utf-8"))
+
+    apps = {}
+    day_totals = {}
+    for day, entry in days.items():
+        if (start and day < start) or (end and day > end):
+            continue
+        seconds = 0
+        for app, value in entry["totals"].items():
+            apps[app] = apps.get(app, 0) + value
+            seconds += value
+        day_totals[day] = seconds
+    return {
+        "machine": machine_name(root),
+        "root": root,
+        "apps": apps,
+        "days": day_totals,
+        "total": sum(day_totals.values()),
+        "files_read": changed,
+        "days_seen": len(days),
+    }
+
+
+def _aggregate(args):
+    return aggregate_machine(*args)
+
+
+def merge(summaries):
+    machines = {}
+    team_apps = {}
+    team_days = {}
+    for summary in summaries:
+        name = summary["machine"]
+        if name in machines:
+            # two roots with the same directory name: keep both
+            name = f"{name} ({summary['root']})"
+        machines[name] = {k: summary[k] for k in ("apps", "days", "total")}
+        for app, seconds in summary["apps"].items():
+            team_apps[app] = team_apps.get(app, 0) + seconds
+        for day, seconds in summary["days"].items():
+            team_days[day] = team_days.get(day, 0) + seconds
+    return {
+        "machines": machines,
+        "team": {
+            "machines": len(machines),
+            "total": sum(team_days.values()),
+            "apps": dict(sorted(team_apps.items(), key=lambda x: x[1], reverse=True)),
+            "days": dict(sorted(team_days.items())),
+        },
+    }
+
+
+def aggregate(roots, cache_dir=None, start=None, end=None, jobs=None):
+    tasks = [(root, cache_dir, start, end) for root in roots]
+    if jobs == 1 or len(tasks) <= 1:
+        summaries = [_aggregate(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # a handful of roots per task keeps IPC small without starving cores
+            chunksize = max(1, len(tasks) // ((jobs or os.cpu_count() or 1) * 4))
+            summaries = list(pool.map(_aggregate, tasks, chunksize=chunksize))
+    report = merge(summaries)
+    report["files_read"] = sum(s["files_read"] for s in summaries)
+    report["days_seen"] = sum(s["days_seen"] for s in summaries)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("roots", nargs="+", help="logs/ directories, one per machine")
+    parser.add_argument("--cache-dir", default="fleet_cache", help="per-machine day totals from earlier runs")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--start", help="first day (YYYY-MM-DD)")
+    parser.add_argument("--end", help="last day (YYYY-MM-DD)")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--output", help="write the full report as JSON")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    # expanded here as well: cmd.exe and PowerShell pass wildcards through as-is
+    roots = {}
+    for pattern in args.roots:
+        matches = sorted(r for r in glob.glob(pattern) if os.path.isdir(r))
+        if not matches:
+            parser.error(f"no log directory matches {pattern}")
+        roots.update(dict.fromkeys(matches))
+    report = aggregate(list(roots),
+                       None if args.no_cache else args.cache_dir, args.start, args.end, args.jobs)
+    elapsed = time.perf_counter() - started
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    team = report["team"]
+    print(f"{team['machines']} machines, {report['days_seen']} machine-days "
+          f"({report['files_read']} re-read) in {elapsed:.2f}s", file=sys.stderr)
+    for app, seconds in list(team["apps"].items())[:args.top]:
+        print(f"{seconds / 3600:10.1f}h  {app}")
@@ -0,0 +1,179 @@
+import queue
+import time
+from collections import deque
+from datetime import date, datetime, timedelta
+from threading import Thread
+from rollup import RollupIndex
+from timeline import TimelineStore
+from titles import TitleTracker
+
+
+def next_midnight(wall):
+    # epoch seconds of the first local midnight after `wall`
+    day = datetime.fromtimestamp(wall).date() + timedelta(days=1)
+    return datetime.combine(day, datetime.min.time()).timestamp()
+
+
+class DayPartition:
+    # Everything persisted for one day: journal + snapshot, timeline, titles.
+    # Records are written into the file buffers as they arrive and pushed to
+    # disk by flush().
+    def __init__(self, logger):
+        self.logger = logger
+        self.day = logger.today
+        self.totals = logger.load_log()
+        self.timeline = TimelineStore(log_dir=logger.log_dir, day=self.day)
+        self.titles = TitleTracker(log_dir=logger.log_dir, day=self.day)
+
+    # journal() and segment() each either apply fully or raise before changing
+    # anything, so the flusher can retry a failed record without counting twice
+
+    def journal(self, app, seconds):
+        self.logger.append_log(app, seconds, flush=False)
+        self.totals[app] = self.totals.get(app, 0) + seconds
+
+    def segment(self, app, start_wall, end_wall):
+        self.timeline.append(start_wall, end_wall, app, flush=False)
+
+    def flush(self):
+        self.logger.flush()
+        self.timeline.flush()
+        if self.logger.needs_compaction():
+            self.logger.save_log(self.totals)
+        # titles have no journal, so their snapshot is what a quit leaves behind
+        if self.titles.dirty:
+            self.titles.save()
+
+    def close(self):
+        self.logger.save_log(self.totals)
+        self.titles.save()
+        self.logger.close()
+        self.timeline.close()
+
+
+class LogFlusher:
+    # Write-behind thread that owns all log I/O for WindowTracker. The tracker
+    # only enqueues (never blocks on disk); this thread applies records to the
+    # per-day partitions, flushes them every `interval` seconds, and closes a
+    # day's partition (final atomic snapshot, rollups) once the tracker has
+    # rolled over past it. A record or flush that fails with OSError is kept and
+    # retried on the next interval; later records wait behind it, in order.
+    def __init__(self, logger, interval=5.0):
+        self.logger = logger
+        self.interval = interval
+        self.current_day = logger.today
+        self.flushes = 0
+        self.errors = 0
+        self._queue = queue.SimpleQueue()
+        self._pending = deque()
+        self._blocked = False
+        self._partitions = {}
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # --- called from the tracker thread ---
+
+    def segment(self, day, app, seconds, start_wall, end_wall):
+        self._queue.put(("journal", day, app, seconds))
+        self._queue.put(("segment", day, app, start_wall, end_wall))
+
+    def title(self, day, app, title, seconds):
+        self._queue.put(("title", day, app, title, seconds))
+
+    def rollover(self, day):
+        self._queue.put(("rollover", day))
+
+    def stop(self, timeout=None):
+        # flushes and closes everything that was enqueued before the call
+        self._queue.put(("stop",))
+        self._thread.join(timeout)
+
+    def stats(self):
+        return {"queued": self._queue.qsize() + len(self._pending), "flushes": self.flushes, "errors": self.errors}
+
+    # --- flusher thread ---
+
+    def _run(self):
+        # 前日分はもう増えないので週次・月次ロールアップへ確定させる
+        self._finalize(date.fromisoformat(self.current_day) - timedelta(days=1))
+        deadline = time.monotonic() + self.interval
+        while True:
+            try:
+                event = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                event = None
+            if event is not None:
+                if event[0] == "stop":
+                    self._drain()
+                    self._flush(close=True)
+                    if self._pending:
+                        print(f"log flush: {len(self._pending)} records could not be written")
+                    return
+                self._pending.append(event)
+                if not self._blocked:
+                    self._drain()
+            if time.monotonic() >= deadline:
+                self._drain()
+                self._flush()
+                deadline = time.monotonic() + self.interval
+
+    def _partition(self, day):
+        partition = self._partitions.get(day)
+        if partition is None:
+            logger = self.logger if day == self.logger.today else self.logger.for_day(day)
+            partition = self._partitions[day] = DayPartition(logger)
+        return partition
+
+    def _drain(self):
+        self._blocked = False
+        while self._pending:
+            event = self._pending[0]
+            try:
+                self._apply(event)
+            except OSError as e:
+                # keep it; retried when the next interval comes round
+                self.errors += 1
+                self._blocked = True
+                print(f"log write failed ({event[1]}): {e}")
+                return
+            except OverflowError as e:
+                # the day's timeline is full; retrying cannot help
+                self.errors += 1
+                print(f"log write dropped ({event[1]}): {e}")
+            self._pending.popleft()
+
+    def _apply(self, event):
+        kind = event[0]
+        if kind == "journal":
+            _, day, app, seconds = event
+            self._partition(day).journal(app, seconds)
+        elif kind == "segment":
+            _, day, app, start_wall, end_wall = event
+            self._partition(day).segment(app, start_wall, end_wall)
+        elif kind == "title":
+            _, day, app, title, seconds = event
+            self._partition(day).titles.add(app, title, seconds)
+        elif kind == "rollover":
+            self.current_day = event[1]
+            self._flush(close=True, keep=self.current_day)
+
+    def _flush(self, close=False, keep=None):
+        for day, partition in list(self._partitions.items()):
+            try:
+                if close and day != keep:
+                    partition.close()
+                    del self._partitions[day]
+                    if day < self.current_day:
+                        self._finalize(date.fromisoformat(day))
+                else:
+                    partition.flush()
+            except OSError as e:
+                self.errors += 1
+                print(f"log flush failed ({day}): {e}")
+        self.flushes += 1
+
+    def _finalize(self, day):
+        try:
+            RollupIndex(self.logger.log_dir).finalize_day(day)
+        except OSError as e:
+            print(f"rollup failed ({day}): {e}")
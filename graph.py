@@ -1,12 +1,11 @@
-import os
-import json
 import textwrap
 import numpy as np
 from datetime import datetime, timedelta
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-from matplotlib.image import imread
+from analytics import load_matrix, stack_layers, top_layer
+from icons import IconCache
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QComboBox,
     QRadioButton, QButtonGroup, QLabel, QSizePolicy
@@ -21,6 +20,7 @@ class LogGraphWidget(FigureCanvas):
 
         self.log_dir = log_dir
         self.icon_dir = icon_dir
+        self.icons = IconCache(icon_dir, zoom=0.15)
         self.time_limit_minutes = 60  # default 3 hours
         self.range_mode = "day"  # or "week"
 
@@ -66,28 +66,9 @@ class LogGraphWidget(FigureCanvas):
         self.update_graph()
 
     def load_logs(self):
-        if not os.path.exists(self.log_dir):
-            return {}
-
-        logs = {}
         today = datetime.today().date()
-        for fname in os.listdir(self.log_dir):
-            if not fname.endswith(".json"):
-                continue
-            try:
-                date_str = fname.replace(".json", "")
-                log_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                if self.range_mode == "day" and log_date != today:
-                    continue
-                elif self.range_mode == "week" and (today - log_date).days > 6:
-                    continue
-                with open(os.path.join(self.log_dir, fname), "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    for k, v in data.items():
-                        logs[k] = logs.get(k, 0) + v
-            except Exception:
-                continue
-        return logs
+        start = today if self.range_mode == "day" else today - timedelta(days=6)
+        return load_matrix(self.log_dir, start, today).totals_dict()
 
     def update_graph(self):
         self.axes.clear()
@@ -100,42 +81,24 @@ class LogGraphWidget(FigureCanvas):
         total_minutes = [log_data[name] / 60 for name in names]
         limit = self.time_limit_minutes
 
-        stacks = []
-        for minutes in total_minutes:
-            layers = []
-            while minutes > limit:
-                layers.append(limit)
-                minutes -= limit
-            layers.append(minutes)
-            stacks.append(layers)
-
-        max_layers = max(len(s) for s in stacks)
+        layers = stack_layers(total_minutes, limit)
+        last_layer = top_layer(total_minutes, limit)
         x = np.arange(len(names))
         bottom = np.zeros(len(names))
 
-        for layer_index in range(max_layers):
-            heights = []
-            for s in stacks:
-                if layer_index < len(s):
-                    heights.append(s[layer_index])
-                else:
-                    heights.append(0)
+        for heights in layers:
             self.axes.bar(x, heights, bottom=bottom, color="lightgray", edgecolor="black")
             bottom += heights
 
         for i, name in enumerate(names):
             wrapped = textwrap.fill(name, width=10)
-            y = bottom[i] - (stacks[i][-1] / 2)
+            y = bottom[i] - (last_layer[i] / 2)
             self.axes.text(x[i], y, wrapped, ha='center', va='center', fontsize=9, color='black')
-            icon_path = os.path.join(self.icon_dir, f"{name}.png")
-            if os.path.exists(icon_path):
-                try:
-                    arr_img = imread(icon_path)
-                    imagebox = OffsetImage(arr_img, zoom=0.15)
-                    ab = AnnotationBbox(imagebox, (x[i], bottom[i] + 5), frameon=False)
-                    self.axes.add_artist(ab)
-                except Exception:
-                    pass
+            # アイコンは縮小済みの配列をキャッシュから取得する（ディスクは読まない）
+            icon = self.icons.get(name)
+            if icon is not None:
+                ab = AnnotationBbox(OffsetImage(icon), (x[i], bottom[i] + 5), frameon=False)
+                self.axes.add_artist(ab)
 
         self.axes.set_ylim(0, self.time_limit_minutes * 1.1)
         self.axes.set_xticks(x)
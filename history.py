@@ -0,0 +1,57 @@
+import os
+from datetime import date, timedelta
+from logger import read_day, snapshot_path, journal_path
+
+
+def day_signature(log_dir, day):
+    # (mtime, size) of the snapshot and journal; None for a missing file
+    signature = []
+    for path in (snapshot_path(log_dir, day), journal_path(log_dir, day)):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class HistoryCache:
+    # Past days are treated as immutable: their parsed totals, and the merged
+    # totals of a range of them, are kept in memory and re-read only when a
+    # file's mtime or size changes. Today's live data is merged by the caller.
+    def __init__(self, log_dir="logs"):
+        self.log_dir = log_dir
+        self._days = {}
+        self._merged_key = None
+        self._merged = None
+
+    def day_totals(self, day):
+        return self._load(day, day_signature(self.log_dir, day))
+
+    def past_totals(self, days, today=None):
+        today = today or date.today()
+        dates = [today - timedelta(days=i) for i in range(1, days + 1)]
+        signatures = tuple(day_signature(self.log_dir, d) for d in dates)
+        key = (today, days, signatures)
+        if key == self._merged_key:
+            return self._merged
+
+        merged = {}
+        for d, signature in zip(dates, signatures):
+            for app, seconds in self._load(d, signature).items():
+                merged[app] = merged.get(app, 0) + seconds
+        # forget days that fell out of the range
+        wanted = set(dates)
+        for d in [d for d in self._days if d not in wanted]:
+            del self._days[d]
+        self._merged_key = key
+        self._merged = merged
+        return merged
+
+    def _load(self, day, signature):
+        cached = self._days.get(day)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        totals = read_day(self.log_dir, day) if any(signature) else {}
+        self._days[day] = (signature, totals)
+        return totals
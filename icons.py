@@ -0,0 +1,105 @@
+import os
+import time
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+
+# Decoded app icons for the graph annotations. Each PNG is read once and kept
+# already scaled to the display zoom, so redraws only wrap a cached array.
+
+
+def _signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class IconCache:
+    # name -> RGBA uint8 array (or None when there is no usable icon), LRU
+    # bounded by the decoded size. A file is re-stat'ed at most every
+    # revalidate_every seconds and reloaded when its mtime/size changed;
+    # missing icons are remembered for negative_ttl seconds before the disk
+    # is checked again.
+    def __init__(self, icon_dir="icons", zoom=0.15, max_bytes=8 * 1024 * 1024, max_entries=1024,
+                 revalidate_every=5.0, negative_ttl=30.0, clock=time.monotonic):
+        self.icon_dir = icon_dir
+        self.zoom = zoom
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.revalidate_every = revalidate_every
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, name):
+        return os.path.join(self.icon_dir, f"{name}.png")
+
+    def get(self, name):
+        now = self.clock()
+        entry = self._entries.get(name)
+        if entry is not None:
+            signature, checked_at, image = entry
+            ttl = self.revalidate_every if image is not None else self.negative_ttl
+            if now - checked_at < ttl:
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return image
+            current = _signature(self.path(name))
+            if current == signature:
+                self._entries[name] = (signature, now, image)
+                self._entries.move_to_end(name)
+                self.hits += 1
+                return image
+            self._discard(name)
+
+        self.misses += 1
+        path = self.path(name)
+        signature = _signature(path)
+        image = self._decode(path) if signature is not None else None
+        self._entries[name] = (signature, now, image)
+        if image is not None:
+            self.bytes += image.nbytes
+        self._evict()
+        return image
+
+    def invalidate(self, name=None):
+        if name is None:
+            self._entries.clear()
+            self.bytes = 0
+        elif name in self._entries:
+            self._discard(name)
+
+    def _decode(self, path):
+        try:
+            with Image.open(path) as img:
+                img = img.convert("RGBA")
+                size = (max(1, round(img.width * self.zoom)), max(1, round(img.height * self.zoom)))
+                return np.asarray(img.resize(size, Image.LANCZOS))
+        except (OSError, ValueError):
+            # unreadable or not an image: treat like a missing icon
+            return None
+
+    def _discard(self, name):
+        _, _, image = self._entries.pop(name)
+        if image is not None:
+            self.bytes -= image.nbytes
+
+    def _evict(self):
+        while len(self._entries) > 1 and (self.bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "bytes": self.bytes,
+        }
@@ -1,25 +1,206 @@
 import json
 import os
-from datetime import datetime
+import re
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta
+from perfstats import STATS, now_ns
+
+# ジャーナル（追記専用）を何件・何秒ためたらスナップショットへ集約するか
+COMPACT_EVERY_EVENTS = 500
+COMPACT_EVERY_SECONDS = 300
+
+DAY_FILE = re.compile(r"^(\d{4}-\d{2}-\d{2})\.jsonl?$")
+
+
+def available_days(log_dir):
+    # one listdir instead of probing every date in the range
+    if not os.path.isdir(log_dir):
+        return set()
+    days = set()
+    for fname in os.listdir(log_dir):
+        m = DAY_FILE.match(fname)
+        if m:
+            days.add(m.group(1))
+    return days
+
+
+def snapshot_path(log_dir, day):
+    return os.path.join(log_dir, f"{day}.json")
+
+
+def journal_path(log_dir, day):
+    return os.path.join(log_dir, f"{day}.jsonl")
+
+
+def _digest(raw):
+    return zlib.crc32(raw)
+
+
+def _read_snapshot(path):
+    # returns (data, digest of the raw bytes); digest 0 means "no snapshot"
+    if not os.path.exists(path):
+        return {}, 0
+    with open(path, "rb") as f:
+        raw = f.read()
+    try:
+        return json.loads(raw.decode("utf-8")), _digest(raw)
+    except ValueError:
+        return {}, 0
+
+
+def _parse_header(line):
+    try:
+        tag, base = json.loads(line)
+    except (ValueError, TypeError):
+        return None
+    return base if tag == "#base" else None
+
+
+def _journal_base(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return _parse_header(f.readline())
+
+
+def _replay_journal(path, base, data):
+    # The first line names the snapshot the journal was started against. If the
+    # snapshot has since been replaced (crash between compaction steps), every
+    # record in this journal is already part of the snapshot and is skipped.
+    if not os.path.exists(path):
+        return data
+    with open(path, "r", encoding="utf-8") as f:
+        if _parse_header(f.readline()) != base:
+            return data
+        for line in f:
+            try:
+                app, seconds = json.loads(line)
+            except (ValueError, TypeError):
+                # truncated tail from an interrupted append
+                continue
+            data[app] = data.get(app, 0) + seconds
+    return data
+
+
+def read_day(log_dir, day):
+    data, base = _read_snapshot(snapshot_path(log_dir, day))
+    return _replay_journal(journal_path(log_dir, day), base, data)
+
+
+def atomic_write(path, raw):
+    # a unique temp file per call: the flusher, the chart worker and a daemon
+    # sharing the log directory may write the same file at the same time
+    directory, name = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(dir=directory or ".", prefix=name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
 
 class Logger:
-    def __init__(self):
-        today = datetime.today().strftime("%Y-%m-%d")
-        self.filename = f"logs/{today}.json"
+    def __init__(self, log_dir="logs", storage="journal", day=None):
+        today = day or datetime.today().strftime("%Y-%m-%d")
+        self.today = today
+        self.log_dir = log_dir
+        self.storage = storage
+        self.filename = snapshot_path(log_dir, today)
+        self.journal_filename = journal_path(log_dir, today)
         self.settings_path = "settings.json"
         self.name_map_path = "display_names.json"
         self.display_flags_path = "display_flags.json"
 
+        self._journal = None
+        self._pending_events = 0
+        self._last_compaction = time.time()
+
     def load_log(self):
-        if os.path.exists(self.filename):
-            with open(self.filename, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
+        if self.storage == "journal":
+            return read_day(self.log_dir, self.today)
+        data, _ = _read_snapshot(self.filename)
+        return data
+
+    def for_day(self, day):
+        # same storage for another day's partition (used across midnight)
+        return Logger(log_dir=self.log_dir, storage=self.storage, day=day)
+
+    def append_log(self, app, seconds, flush=True):
+        # O(1) per switch: one compact line appended to today's journal
+        if self.storage != "journal":
+            return
+        started = now_ns()
+        if self._journal is None:
+            self._open_journal()
+        line = json.dumps([app, round(seconds, 3)], ensure_ascii=False, separators=(",", ":")) + "\n"
+        self._journal.write(line)
+        if flush:
+            self._journal.flush()
+        self._pending_events += 1
+        STATS.record("logger.append_log", now_ns() - started, len(line.encode("utf-8")))
+
+    def needs_compaction(self):
+        if self.storage != "journal":
+            return True
+        if self._pending_events == 0:
+            return False
+        return (self._pending_events >= COMPACT_EVERY_EVENTS
+                or time.time() - self._last_compaction >= COMPACT_EVERY_SECONDS)
 
     def save_log(self, data):
-        os.makedirs("logs", exist_ok=True)
-        with open(self.filename, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Full aggregate snapshot, written atomically. In journal mode this is the
+        # compaction step: the journal is restarted against the new snapshot.
+        started = now_ns()
+        os.makedirs(self.log_dir, exist_ok=True)
+        raw = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+        atomic_write(self.filename, raw)
+        if self.storage == "journal":
+            self._reset_journal(_digest(raw))
+        STATS.record("logger.save_log", now_ns() - started, len(raw))
+
+    def flush(self):
+        if self._journal is not None:
+            self._journal.flush()
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    def _open_journal(self):
+        os.makedirs(self.log_dir, exist_ok=True)
+        _, base = _read_snapshot(self.filename)
+        if _journal_base(self.journal_filename) != base:
+            # missing, or left over from an interrupted compaction
+            self._reset_journal(base)
+        self._journal = open(self.journal_filename, "a", encoding="utf-8")
+
+    def _reset_journal(self, base):
+        self.close()
+        header = json.dumps(["#base", base]) + "\n"
+        atomic_write(self.journal_filename, header.encode("utf-8"))
+        self._pending_events = 0
+        self._last_compaction = time.time()
+
+    def iter_days(self, start, end):
+        # (day, totals) for every logged day in [start, end], oldest first;
+        # one day is in memory at a time
+        present = available_days(self.log_dir)
+        day = start
+        while day <= end:
+            key = day.isoformat()
+            if key in present:
+                yield key, read_day(self.log_dir, key)
+            day += timedelta(days=1)
 
     def load_settings(self):
         if os.path.exists(self.settings_path):
@@ -1,24 +1,21 @@
-import sys, os, json, textwrap
-import numpy as np
+import time
+_STARTED = time.perf_counter()
+import sys, os, json
+from bisect import bisect_left
 from PySide6.QtWidgets import (
     QCheckBox,
-    QApplication, QLabel, QVBoxLayout, QWidget, QTableWidget, QTableWidgetItem,
+    QApplication, QLabel, QVBoxLayout, QWidget, QTableView,
     QPushButton, QDialog, QLineEdit, QFormLayout, QDialogButtonBox, QMenu,
     QSystemTrayIcon, QHBoxLayout, QSizePolicy, QHeaderView, QComboBox, QRadioButton, 
-    QButtonGroup, QSpacerItem
+    QButtonGroup, QSpacerItem, QTableWidget, QTableWidgetItem, QMessageBox
 )
-from PySide6.QtGui import QIcon, QAction
-from PySide6.QtCore import QTimer, Qt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-from matplotlib.image import imread
-from matplotlib.offsetbox import OffsetImage, AnnotationBbox
-import matplotlib
-matplotlib.rcParams['font.family'] = 'Yu Gothic'
+from PySide6.QtGui import QIcon, QAction, QKeySequence, QShortcut, QPixmap
+from PySide6.QtCore import QTimer, Qt, QAbstractTableModel, QModelIndex, QSize, QObject, Signal
 from threading import Thread
-from tracker import WindowTracker
-from logger import Logger
-from datetime import datetime, timedelta
+from tracker import WindowTracker, changed_apps
+from perfstats import STATS, now_ns
+from rules import valid_rules
+from config import shared_store
 
 def format_seconds(seconds):
     minutes = int(seconds) // 60
@@ -32,6 +29,101 @@ def format_progress(current_sec, target_min):
     progress = min(current_sec / target_sec * 100, 100)
     return f"{progress:.1f}%"
 
+class ActivityTableModel(QAbstractTableModel):
+    # 行は累積時間の降順で保持し、変化したセルと順位が変わった行だけを通知する
+    HEADERS = ["アプリ名", "累積時間", "進捗率"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.seconds = {}
+        self.name_map = {}
+        self.settings = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        app = self.rows[index.row()]
+        sec = self.seconds[app]
+        column = index.column()
+        if column == 0:
+            return self.name_map.get(app, app)
+        if column == 1:
+            return format_seconds(sec)
+        return format_progress(sec, self.settings.get(app, 0))
+
+    def items(self):
+        return {app: self.seconds[app] for app in self.rows}
+
+    def update_rows(self, log):
+        for app in [app for app in self.seconds if app not in log]:
+            row = self._find(app)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.rows[row]
+            del self.seconds[app]
+            self.endRemoveRows()
+
+        for app, sec in log.items():
+            self.set_seconds(app, sec)
+
+    def set_seconds(self, app, sec):
+        old = self.seconds.get(app)
+        if old is None:
+            self.seconds[app] = sec
+            row = bisect_left(self.rows, self._sort_key(app), key=self._sort_key)
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.rows.insert(row, app)
+            self.endInsertRows()
+        elif old != sec:
+            src = self._find(app)
+            self.seconds[app] = sec
+            row = self._reposition(app, src, sec > old)
+            self.dataChanged.emit(self.index(row, 1), self.index(row, 2))
+
+    def refresh(self):
+        # 表示名・目標時間の変更時のみ全セルを再描画
+        if self.rows:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.rows) - 1, 2))
+
+    def _sort_key(self, app):
+        return (-self.seconds[app], app)
+
+    def _find(self, app):
+        return bisect_left(self.rows, self._sort_key(app), key=self._sort_key)
+
+    def _reposition(self, app, src, increased):
+        # 他の行は整列済みなので、この行の移動先だけを二分探索で求める
+        rows = self.rows
+        key = self._sort_key(app)
+        if increased:
+            dest = bisect_left(rows, key, 0, src, key=self._sort_key)
+            if dest == src:
+                return src
+            self.beginMoveRows(QModelIndex(), src, src, QModelIndex(), dest)
+            del rows[src]
+            rows.insert(dest, app)
+        else:
+            dest = bisect_left(rows, key, src + 1, len(rows), key=self._sort_key)
+            if dest == src + 1:
+                return src
+            self.beginMoveRows(QModelIndex(), src, src, QModelIndex(), dest)
+            del rows[src]
+            dest -= 1
+            rows.insert(dest, app)
+        self.endMoveRows()
+        return dest
+
 class SettingsDialog(QDialog):
     def __init__(self, current_settings, parent=None):
         super().__init__(parent)
@@ -56,7 +148,9 @@ class SettingsDialog(QDialog):
         }
 
 class NameMapDialog(QDialog):
-    def __init__(self, name_map, parent=None):
+    RULE_COLUMNS = ["表示名", "プロセス名", "ウィンドウタイトル", "正規表現"]
+
+    def __init__(self, name_map, parent=None, rules=()):
         super().__init__(parent)
         self.setWindowTitle("表示名の編集")
         self.setMinimumSize(0, 0)
@@ -79,6 +173,24 @@ class NameMapDialog(QDialog):
             container.setLayout(row_layout)
             layout.addRow(QLabel(process), container)
 
+        # ルール：* と ? のワイルドカード（| で複数指定）、または正規表現。上の行から順に判定する
+        layout.addRow(QLabel("ルール（プロセス名・タイトルで表示名をまとめる。上から順に適用）"))
+        self.rules_table = QTableWidget(0, len(self.RULE_COLUMNS))
+        self.rules_table.setHorizontalHeaderLabels(self.RULE_COLUMNS)
+        self.rules_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        for rule in rules:
+            self.add_rule_row(rule)
+        layout.addRow(self.rules_table)
+        rule_buttons = QHBoxLayout()
+        add_button = QPushButton("ルールを追加")
+        add_button.clicked.connect(lambda: self.add_rule_row({}))
+        remove_button = QPushButton("選択したルールを削除")
+        remove_button.clicked.connect(self.remove_rule_rows)
+        rule_buttons.addStretch()
+        rule_buttons.addWidget(add_button)
+        rule_buttons.addWidget(remove_button)
+        layout.addRow(rule_buttons)
+
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         buttons.accepted.connect(self.accept)
         buttons.rejected.connect(self.reject)
@@ -97,17 +209,134 @@ class NameMapDialog(QDialog):
             for proc, check in self.checks.items()
         }
 
-class LogGraphWidget(FigureCanvas):
-    def __init__(self, log_dir="logs", icon_dir="icons"):
-        self.fig = Figure(figsize=(5, 3))
-        self.axes = self.fig.add_subplot(111)
-        super().__init__(self.fig)
+    def add_rule_row(self, rule):
+        row = self.rules_table.rowCount()
+        self.rules_table.insertRow(row)
+        for col, key in enumerate(("name", "process", "title")):
+            self.rules_table.setItem(row, col, QTableWidgetItem(rule.get(key, "")))
+        regex = QTableWidgetItem()
+        regex.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
+        regex.setCheckState(Qt.Checked if rule.get("regex") else Qt.Unchecked)
+        self.rules_table.setItem(row, 3, regex)
+
+    def remove_rule_rows(self):
+        for row in sorted({index.row() for index in self.rules_table.selectedIndexes()}, reverse=True):
+            self.rules_table.removeRow(row)
+
+    def get_rules(self):
+        rules = []
+        for row in range(self.rules_table.rowCount()):
+            name, process, title = (self.rules_table.item(row, col).text().strip() for col in range(3))
+            if not name or not (process or title):
+                continue
+            rule = {"name": name}
+            if process:
+                rule["process"] = process
+            if title:
+                rule["title"] = title
+            if self.rules_table.item(row, 3).checkState() == Qt.Checked:
+                rule["regex"] = True
+            rules.append(rule)
+        return rules
+
+    def accept(self):
+        _, errors = valid_rules(self.get_rules())
+        if errors:
+            QMessageBox.warning(self, "ルールの誤り", "\n".join(errors))
+            return
+        super().accept()
+
+class PerfStatsDialog(QDialog):
+    # Ctrl+Shift+P で開く計測値の一覧（開いている間だけ集計する）
+    COLUMNS = ["項目", "回数", "p50 (ms)", "p95 (ms)", "p99 (ms)", "最大 (ms)", "書込バイト"]
+
+    def __init__(self, tracker, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("パフォーマンス統計")
+        self.tracker = tracker
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.table)
+        self.extra_label = QLabel()
+        layout.addWidget(self.extra_label)
+        self.resize(640, 280)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.refresh()
+
+    def showEvent(self, event):
+        self.timer.start(1000)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
+
+    def refresh(self):
+        summary = STATS.summary()
+        self.table.setRowCount(len(summary))
+        for row, (name, s) in enumerate(summary.items()):
+            values = [name, str(s["count"]), f"{s['p50_ms']:.3f}", f"{s['p95_ms']:.3f}",
+                      f"{s['p99_ms']:.3f}", f"{s['max_ms']:.3f}", str(s["bytes"])]
+            for col, value in enumerate(values):
+                self.table.setItem(row, col, QTableWidgetItem(value))
+
+        extra = []
+        probe_stats = self.tracker.get_probe_stats()
+        if probe_stats:
+            extra.append("プロセス名キャッシュ: " + ", ".join(f"{k}={v}" for k, v in probe_stats.items()))
+        scheduler = getattr(self.tracker, "scheduler", None)
+        if scheduler is not None:
+            extra.append("サンプリング: " + ", ".join(f"{k}={v:g}" for k, v in scheduler.stats().items()))
+        flusher = getattr(self.tracker, "flusher", None)
+        if flusher is not None:
+            extra.append("ログ書き込み: " + ", ".join(f"{k}={v}" for k, v in flusher.stats().items()))
+        rules = getattr(self.tracker, "rules", None)
+        if rules is not None:
+            extra.append("表示名ルール: " + ", ".join(f"{k}={v}" for k, v in rules.stats().items()))
+        self.extra_label.setText("\n".join(extra))
+
+class ChartView(QLabel):
+    # ワーカーが描いた画像を表示するだけのラベル（画像の大きさでレイアウトを変えない）
+    def __init__(self):
+        super().__init__()
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setAlignment(Qt.AlignCenter)
+
+    def sizeHint(self):
+        return QSize(500, 300)
+
+    def minimumSizeHint(self):
+        return QSize(200, 120)
+
+class LogGraphWidget(QWidget):
+    # グラフ領域。集計と描画は ChartWorker のスレッドで行い、ここでは画像を貼るだけ。
+    # matplotlib は初めて表示されたときに読み込む
+    def __init__(self, log_dir="logs", icon_dir="icons", history_client=None):
+        super().__init__()
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.worker = None
+        # --connect 時は過去分もデーモンから取る（ワーカー用の接続を作る関数）
+        self.history_client = history_client
+        self.history = None
+        self.view = ChartView()
+        canvas_layout = QVBoxLayout(self)
+        canvas_layout.setContentsMargins(0, 0, 0, 0)
+        canvas_layout.addWidget(self.view)
 
         self.log_dir = log_dir
         self.icon_dir = icon_dir
         self.time_limit_minutes = 180
         self.range_mode = "day"
+        self.current_log = {}
+        # 非表示中は update_graph を呼ばれないので、表示時はここから最新の行を取る
+        self.log_source = None
+        self.frames = 0
+        self._dirty = True
 
         self.toggle_button = QPushButton("グラフ表示")
         self.toggle_button.setCheckable(True)
@@ -133,14 +362,15 @@ class LogGraphWidget(FigureCanvas):
 
         self.day_radio = QRadioButton("今日")
         self.week_radio = QRadioButton("1週間")
+        self.month_radio = QRadioButton("1ヶ月")
+        self.year_radio = QRadioButton("1年")
         self.day_radio.setChecked(True)
         self.range_group = QButtonGroup()
-        self.range_group.addButton(self.day_radio)
-        self.range_group.addButton(self.week_radio)
-        self.day_radio.toggled.connect(self.on_range_changed)
         control_layout.addWidget(QLabel("表示範囲:"))
-        control_layout.addWidget(self.day_radio)
-        control_layout.addWidget(self.week_radio)
+        for radio in (self.day_radio, self.week_radio, self.month_radio, self.year_radio):
+            self.range_group.addButton(radio)
+            control_layout.addWidget(radio)
+        self.range_group.buttonToggled.connect(self.on_range_changed)
 
         control_layout.addWidget(self.toggle_button)
         control_layout.addSpacerItem(QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum))
@@ -154,58 +384,72 @@ class LogGraphWidget(FigureCanvas):
         self.setVisible(checked)
         self.toggle_button.setText("グラフ非表示" if checked else "グラフ表示")
         self.ui.adjustSize()
+        if checked and self._dirty:
+            self.update_graph(self.log_source() if self.log_source else self.current_log)
 
     def on_time_limit_changed(self):
         index = self.time_limit_combo.currentIndex()
         self.time_limit_minutes = [60, 180, 360, 720][index]
         self.update_graph(self.current_log)
 
-    def on_range_changed(self):
-        self.range_mode = "day" if self.day_radio.isChecked() else "week"
+    def on_range_changed(self, button=None, checked=True):
+        if not checked:
+            return
+        if self.week_radio.isChecked():
+            self.range_mode = "week"
+        elif self.month_radio.isChecked():
+            self.range_mode = "month"
+        elif self.year_radio.isChecked():
+            self.range_mode = "year"
+        else:
+            self.range_mode = "day"
         self.update_graph(self.current_log)
 
     def update_graph(self, log_data):
         display_flags = self.parent().display_flags if hasattr(self.parent(), 'display_flags') else {}
         log_data = {k: v for k, v in log_data.items() if display_flags.get(k, True)}
-        self.axes.clear()
-        self.axes.set_ylim(0, self.time_limit_minutes * 1.1)
         self.current_log = log_data
 
-        # Load additional logs if range_mode is 'week'
-        if self.range_mode == "week":
-            today = datetime.today().date()
-            combined = log_data.copy()
-            for i in range(1, 7):
-                past_date = today - timedelta(days=i)
-                fname = os.path.join(self.log_dir, f"{past_date}.json")
-                if os.path.exists(fname):
-                    with open(fname, "r", encoding="utf-8") as f:
-                        day_log = json.load(f)
-                        for k, v in day_log.items():
-                            combined[k] = combined.get(k, 0) + v
-            log_data = combined
-
-        if not log_data:
-            self.draw()
+        # 非表示中は描画しない（表示時にまとめて描画する）
+        if not self.isVisible():
+            self._dirty = True
             return
-
-        names = list(log_data.keys())
-        total_minutes = [log_data[name] / 60 for name in names]
-
-        bars = self.axes.bar(range(len(names)), total_minutes, color="lightgray")
-        self.axes.set_ylabel("時間（分）")
-        self.axes.set_title("アプリ別アクティブ時間")
-        self.axes.set_xticks(range(len(names)))
-        self.axes.set_xticklabels(["" for _ in names])
-
-        for bar, name in zip(bars, names):
-            wrapped = textwrap.fill(name, width=10)
-            x = bar.get_x() + bar.get_width() / 2
-            y = bar.get_height() / 2
-            self.axes.text(x, y, wrapped, ha='center', va='center', fontsize=9, color='black')
-
-        self.fig.tight_layout()
-        self.draw()
+        self._dirty = False
+        started = now_ns()
+
+        if self.worker is None:
+            from activity_chart import ChartWorker
+            past_totals = None
+            if self.history_client is not None:
+                self.history = self.history_client()
+                past_totals = self.history.past_totals
+            self.worker = ChartWorker(self.log_dir, past_totals)
+            self.worker.frame_ready.connect(self.on_frame_ready)
+        size = (self.view.width(), self.view.height(), self.view.devicePixelRatioF())
+        self.worker.submit((self.range_mode, log_data, self.time_limit_minutes, size))
+        STATS.record("ui.update_graph", now_ns() - started)
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def on_frame_ready(self, image, request):
+        self.view.setPixmap(QPixmap.fromImage(image))
+        self.frames += 1
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.worker is not None and self.isVisible():
+            self.update_graph(self.current_log)
+
+    def shutdown(self):
+        if self.worker is not None:
+            self.worker.stop()
+        if self.history is not None:
+            self.history.stop()
+
+class ConfigBridge(QObject):
+    # 設定の変更通知を UI スレッドへ渡す（ポーリングスレッドからの通知はキュー経由になる）
+    changed = Signal(str, object)
 
 class TrackerApp(QWidget):
     def __init__(self, tracker):
@@ -214,9 +458,13 @@ class TrackerApp(QWidget):
         self.setWindowTitle("Window Activity Tracker")
         self.setMinimumSize(0, 0)
 
-        self.logger = Logger()
-        self.display_flags = self.logger.load_display_flags()
-        self.settings = self.logger.load_settings()
+        self.config = getattr(tracker, "config", None) or shared_store()
+        self.display_flags = self.config.get("display_flags")
+        self.settings = dict(self.config.get("settings"))
+        self.config_bridge = ConfigBridge()
+        self.config_bridge.changed.connect(self.on_config_changed)
+        self._config_listener = self.config_bridge.changed.emit
+        self.config.subscribe(self._config_listener)
 
         layout = QVBoxLayout()
         self.setLayout(layout)
@@ -224,14 +472,18 @@ class TrackerApp(QWidget):
         self.label = QLabel("アクティブウィンドウの時間を記録中…")
         layout.addWidget(self.label)
 
-        self.table = QTableWidget(0, 3)
+        self.model = ActivityTableModel(self)
+        self.model.settings = self.settings
+        self.table = QTableView()
+        self.table.setModel(self.model)
         self.table.setMinimumSize(0, 0)
-        self.table.setHorizontalHeaderLabels(["アプリ名", "累積時間", "進捗率"])
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
         layout.addWidget(self.table)
 
-        self.graph = LogGraphWidget(log_dir="logs", icon_dir="icons")
+        self.graph = LogGraphWidget(log_dir="logs", icon_dir="icons",
+                                    history_client=getattr(tracker, "history_client", None))
+        self.graph.log_source = self.model.items
         layout.addWidget(self.graph.ui)
 
         button_layout = QHBoxLayout()
@@ -248,26 +500,66 @@ class TrackerApp(QWidget):
         self.timer.timeout.connect(self.update_table)
         self.timer.start(1000)
 
+        self.stats_dialog = None
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, self.open_stats_dialog)
+        # PRODUCTIVITY_TRACKER_PERF_LOG=perf.jsonl で1分ごとに統計を追記する
+        self.perf_log = os.environ.get("PRODUCTIVITY_TRACKER_PERF_LOG")
+        if self.perf_log:
+            self.perf_timer = QTimer(self)
+            self.perf_timer.timeout.connect(self.dump_perf_stats)
+            self.perf_timer.start(60 * 1000)
+
+        self.seen_version = None
         self.update_table()
 
     def update_table(self):
-        log = self.tracker.get_log()
+        started = now_ns()
+        try:
+            self._update_table()
+        except ConnectionError as e:
+            # --connect 先のデーモンが止まった：毎秒の再試行はせず、表示して止める
+            self.timer.stop()
+            self.label.setText(f"トラッカーとの接続が切れました（{e}）")
+            return
+        STATS.record("ui.update_table", now_ns() - started)
+
+    def _update_table(self):
+        snapshot = self.tracker.get_snapshot()
         name_map = self.tracker.get_name_map()
-        sorted_log = dict(sorted(log.items(), key=lambda x: x[1], reverse=True))
+        if name_map is not self.model.name_map:
+            self.model.name_map = name_map
+            self.model.refresh()
 
-        # フィルタリング：非表示のアプリは除外
         display_flags = self.display_flags
-        filtered_log = {k: v for k, v in sorted_log.items() if display_flags.get(k, True)}
-
-        self.table.setRowCount(len(filtered_log))
-        for i, (title, sec) in enumerate(filtered_log.items()):
-            display_name = name_map.get(title, title)
-            goal = self.settings.get(title, 0)
-            self.table.setItem(i, 0, QTableWidgetItem(display_name))
-            self.table.setItem(i, 1, QTableWidgetItem(format_seconds(sec)))
-            self.table.setItem(i, 2, QTableWidgetItem(format_progress(sec, goal)))
+        current = snapshot.current_app
+        if not display_flags.get(current, True):
+            current = None
+
+        changed = ()
+        if snapshot.version != self.seen_version:
+            changed = changed_apps(snapshot, self.seen_version)
+            self.seen_version = snapshot.version
+        if changed is None:
+            # 日付が変わった・表示設定が変わったなどで差分が分からないときだけ全行を作り直す
+            filtered_log = {k: v for k, v in snapshot.totals.items() if display_flags.get(k, True)}
+            if current:
+                filtered_log[current] = filtered_log.get(current, 0) + self.tracker.running_seconds(snapshot)
+            self.model.update_rows(filtered_log)
+        elif changed or current:
+            # 確定時間が変わったアプリと記録中のアプリの行だけを更新する
+            for app in changed:
+                if app != current and display_flags.get(app, True):
+                    self.model.set_seconds(app, snapshot.totals[app])
+            if current:
+                self.model.set_seconds(current, snapshot.totals.get(current, 0) + self.tracker.running_seconds(snapshot))
+        else:
+            return
 
-        self.graph.update_graph(filtered_log)
+        # グラフ非表示中は行をコピーしない（表示時に log_source から取り直す）
+        if self.graph.isVisible():
+            self.graph.update_graph(self.model.items())
+        else:
+            self.graph.mark_dirty()
 
     def open_settings_dialog(self):
         name_map = self.tracker.get_name_map()
@@ -276,36 +568,83 @@ class TrackerApp(QWidget):
                 self.settings[app] = 0
         dialog = SettingsDialog(self.settings, self)
         if dialog.exec():
-            self.settings = dialog.get_settings()
-            self.logger.save_settings(self.settings)
-            self.update_table()
+            self.config.set("settings", dialog.get_settings())
 
     def open_name_map_dialog(self):
-        current_map = self.tracker.get_name_map()
+        current_map = dict(self.tracker.get_name_map())
         for app in self.tracker.get_log().keys():
             if app not in current_map and app not in current_map.values():
                 current_map[app] = app
-        dialog = NameMapDialog(current_map, self)
+        dialog = NameMapDialog(current_map, self, self.tracker.get_rules())
         if dialog.exec():
-            new_map = dialog.get_updated_map()
-            display_flags = dialog.get_display_flags()
-            self.logger.save_name_map(new_map)
-            self.display_flags = display_flags
-            self.logger.save_display_flags(display_flags)
-            self.tracker.set_name_map(new_map)
-            self.tracker.set_name_map(new_map)
-            self.logger.save_name_map(new_map)
-            self.update_table()
+            # 変更のあったものだけが保存され、on_config_changed で反映される
+            self.tracker.set_rules(dialog.get_rules())
+            self.tracker.set_name_map(dialog.get_updated_map())
+            self.config.set("display_flags", dialog.get_display_flags())
+
+    def on_config_changed(self, key, value):
+        if key == "settings":
+            self.settings = dict(value)
+            self.model.settings = self.settings
+            self.model.refresh()
+        elif key == "display_flags":
+            self.display_flags = value
+            self.seen_version = None
+        elif key != "name_map":
+            return
+        self.update_table()
+
+    def open_stats_dialog(self):
+        if self.stats_dialog is None:
+            self.stats_dialog = PerfStatsDialog(self.tracker, self)
+        self.stats_dialog.refresh()
+        self.stats_dialog.show()
+        self.stats_dialog.raise_()
+
+    def dump_perf_stats(self):
+        try:
+            STATS.dump(self.perf_log, {"probe": self.tracker.get_probe_stats()})
+        except OSError as e:
+            print(f"perf log: {e}")
 
     def closeEvent(self, event):
+        if self.perf_log:
+            self.dump_perf_stats()
+        self.graph.shutdown()
+        self.config.unsubscribe(self._config_listener)
+        self.config.flush()
         self.tracker.stop()
         QApplication.quit()
 
+def report_startup(app, imported_at):
+    # python main.py --startup-time : 起動時間の計測（イベントループ開始直後に終了する）
+    shown_at = time.perf_counter()
+    print(json.dumps({
+        "import_ms": round((imported_at - _STARTED) * 1000, 1),
+        "window_shown_ms": round((shown_at - _STARTED) * 1000, 1),
+        "matplotlib_loaded": "matplotlib" in sys.modules,
+        "numpy_loaded": "numpy" in sys.modules,
+    }))
+    app.quit()
+
 if __name__ == "__main__":
+    imported_at = time.perf_counter()
     app = QApplication(sys.argv)
-    tracker = WindowTracker()
-    thread = Thread(target=tracker.track, daemon=True)
-    thread.start()
+    if "--connect" in sys.argv:
+        # python main.py --connect PORT : daemon.py で動いているトラッカーに接続する
+        from daemon import TrackerClient
+        tracker = TrackerClient(port=int(sys.argv[sys.argv.index("--connect") + 1]))
+    else:
+        tracker = WindowTracker()
+        thread = Thread(target=tracker.track, daemon=True)
+        thread.start()
     win = TrackerApp(tracker)
     win.show()
-    sys.exit(app.exec())
+    if "--startup-time" in sys.argv:
+        QTimer.singleShot(0, lambda: report_startup(app, imported_at))
+    code = app.exec()
+    tracker.stop()
+    if "--connect" not in sys.argv:
+        # 書き出し待ちのログをフラッシュし終えるまで待つ
+        thread.join(timeout=10)
+    sys.exit(code)
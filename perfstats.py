@@ -0,0 +1,92 @@
+import json
+import time
+
+# Always-on timing counters for the hot paths. Recording is two
+# perf_counter_ns() calls and a bucket increment; percentiles are only
+# computed when somebody opens the stats dialog or a dump is written.
+
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS  # per power of two, i.e. about 9% relative resolution
+
+
+def _bucket(ns):
+    bits = ns.bit_length()
+    if bits <= SUB_BITS:
+        return ns
+    # octave index plus the SUB_BITS bits below the leading one
+    return (bits - SUB_BITS) * SUB_BUCKETS + ((ns >> (bits - SUB_BITS - 1)) & (SUB_BUCKETS - 1))
+
+
+def _bucket_floor(index):
+    if index < SUB_BUCKETS:
+        return index
+    bits = index // SUB_BUCKETS + SUB_BITS
+    return (SUB_BUCKETS | (index % SUB_BUCKETS)) << (bits - SUB_BITS - 1)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.bytes = 0
+
+    def record(self, ns, size=0):
+        index = _bucket(ns)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.bytes += size
+
+    def percentile(self, p):
+        if not self.count:
+            return 0
+        target = p / 100 * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                # midpoint of the bucket, but never above the largest sample
+                return min((_bucket_floor(index) + _bucket_floor(index + 1)) / 2, self.max_ns)
+        return self.max_ns
+
+    def summary(self):
+        ms = 1e-6
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count * ms if self.count else 0,
+            "p50_ms": self.percentile(50) * ms,
+            "p95_ms": self.percentile(95) * ms,
+            "p99_ms": self.percentile(99) * ms,
+            "max_ms": self.max_ns * ms,
+            "bytes": self.bytes,
+        }
+
+
+class PerfStats:
+    def __init__(self):
+        self.histograms = {}
+
+    def record(self, name, ns, size=0):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms.setdefault(name, Histogram())
+        histogram.record(ns, size)
+
+    def summary(self):
+        return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def dump(self, path, extra=None):
+        # one JSON object per line, appended
+        line = {"time": time.time(), "metrics": self.summary()}
+        if extra:
+            line.update(extra)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(line, ensure_ascii=False) + "\n")
+
+
+STATS = PerfStats()
+now_ns = time.perf_counter_ns
@@ -0,0 +1,259 @@
+import json
+import random
+import time
+from collections import OrderedDict, namedtuple
+from threading import Event
+
+ForegroundSample = namedtuple("ForegroundSample", ["hwnd", "pid", "process_name", "title"])
+
+
+class ForegroundProbe:
+    # Source of "which window is in front" plus the clock the tracker runs on.
+    # Live backends use the real clock; replay backends supply a virtual one.
+    def __init__(self):
+        self._wakeup = Event()
+
+    def sample(self):
+        raise NotImplementedError
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        # real-clock wait that wake() cuts short
+        self._wakeup.wait(seconds)
+
+    def wake(self):
+        # called from another thread to end the tracker's current wait (stop)
+        self._wakeup.set()
+
+    def idle_seconds(self):
+        # seconds since the last keyboard/mouse input, when the backend knows
+        return 0
+
+    def finished(self):
+        return False
+
+    def stats(self):
+        return {}
+
+
+class ProcessNameCache:
+    # (hwnd, pid) -> process name, bounded LRU. An entry is trusted only while
+    # the process create-time still matches, so a recycled pid gets a fresh
+    # lookup. While the same window stays in front the owning process cannot
+    # have exited, so repeat ticks skip validation until revalidate_every.
+    def __init__(self, psutil, maxsize=256, revalidate_every=60, prune_every=600):
+        self._psutil = psutil
+        self.maxsize = maxsize
+        self.revalidate_every = revalidate_every
+        self.prune_every = prune_every
+        self._entries = OrderedDict()
+        self._last_key = None
+        self._streak = 0
+        self._lookups = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, hwnd, pid):
+        key = (hwnd, pid)
+        self._lookups += 1
+        if self._lookups % self.prune_every == 0:
+            self.prune()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if key == self._last_key and self._streak < self.revalidate_every:
+                self._streak += 1
+                self.hits += 1
+                return entry[1]
+            if self._create_time(pid) == entry[0]:
+                self._entries.move_to_end(key)
+                self._last_key = key
+                self._streak = 0
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+            self.evictions += 1
+
+        self.misses += 1
+        try:
+            process = self._psutil.Process(pid)
+            name = process.name()
+            create_time = process.create_time()
+        except self._psutil.Error:
+            self._last_key = None
+            raise
+        self._entries[key] = (create_time, name)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._last_key = key
+        self._streak = 0
+        return name
+
+    def prune(self):
+        # drop entries whose process has exited
+        for key in [k for k in self._entries if not self._psutil.pid_exists(k[1])]:
+            del self._entries[key]
+            self.evictions += 1
+
+    def _create_time(self, pid):
+        try:
+            return self._psutil.Process(pid).create_time()
+        except self._psutil.Error:
+            return None
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+
+class Win32Probe(ForegroundProbe):
+    def __init__(self):
+        super().__init__()
+        import win32api, win32gui, win32process, psutil
+        self._win32api = win32api
+        self._win32gui = win32gui
+        self._win32process = win32process
+        self.cache = ProcessNameCache(psutil)
+
+    def sample(self):
+        hwnd = self._win32gui.GetForegroundWindow()
+        _, pid = self._win32process.GetWindowThreadProcessId(hwnd)
+        process_name = self.cache.lookup(hwnd, pid)
+        title = self._win32gui.GetWindowText(hwnd)
+        return ForegroundSample(hwnd, pid, process_name, title)
+
+    def idle_seconds(self):
+        # both values are 32-bit millisecond tick counts that wrap every ~49 days
+        ticks = (self._win32api.GetTickCount() - self._win32api.GetLastInputInfo()) & 0xFFFFFFFF
+        return ticks / 1000
+
+    def stats(self):
+        return self.cache.stats()
+
+
+class ReplayProbe(ForegroundProbe):
+    # events: iterable of (timestamp, pid, process_name, title), sorted by time.
+    # sleep() only advances a virtual clock, so a replay runs as fast as the
+    # tracker loop can go while seeing exactly the recorded timeline.
+    def __init__(self, events, end_time=None):
+        super().__init__()
+        self.events = [tuple(e) for e in events]
+        if not self.events:
+            raise ValueError("replay stream is empty")
+        self._index = 0
+        self._now = self.events[0][0]
+        self.end_time = end_time if end_time is not None else self.events[-1][0] + 1
+
+    @classmethod
+    def from_file(cls, path, end_time=None):
+        events = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    events.append(json.loads(line))
+        return cls(events, end_time=end_time)
+
+    def sample(self):
+        events = self.events
+        while self._index + 1 < len(events) and events[self._index + 1][0] <= self._now:
+            self._index += 1
+        timestamp, pid, process_name, title = events[self._index]
+        return ForegroundSample(pid, pid, process_name, title)
+
+    def time(self):
+        return self._now
+
+    def monotonic(self):
+        return self._now
+
+    def sleep(self, seconds):
+        self._now += seconds
+
+    def finished(self):
+        return self._now >= self.end_time
+
+
+class RecordingProbe(ForegroundProbe):
+    # Wraps a live probe and writes every foreground change as a replay line.
+    def __init__(self, inner, path):
+        super().__init__()
+        self.inner = inner
+        self._file = open(path, "a", encoding="utf-8")
+        self._last = None
+
+    def sample(self):
+        sample = self.inner.sample()
+        key = (sample.pid, sample.process_name, sample.title)
+        if key != self._last:
+            self._last = key
+            record = [self.inner.time(), sample.pid, sample.process_name, sample.title]
+            self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._file.flush()
+        return sample
+
+    def time(self):
+        return self.inner.time()
+
+    def monotonic(self):
+        return self.inner.monotonic()
+
+    def sleep(self, seconds):
+        self.inner.sleep(seconds)
+
+    def wake(self):
+        self.inner.wake()
+
+    def idle_seconds(self):
+        return self.inner.idle_seconds()
+
+    def finished(self):
+        return self.inner.finished()
+
+
+def synthetic_events(n_apps=10, switches=1000, mean_dwell=30.0, start=0.0, seed=0):
+    # Deterministic workload: exponential dwell times, Zipf-ish app popularity.
+    rng = random.Random(seed)
+    apps = [f"app{i:04d}.exe" for i in range(n_apps)]
+    weights = [1.0 / (i + 1) for i in range(n_apps)]
+    events = []
+    now = start
+    for _ in range(switches):
+        i = rng.choices(range(n_apps), weights)[0]
+        events.append((now, 1000 + i, apps[i], f"{apps[i]} - window {rng.randrange(20)}"))
+        now += max(1.0, rng.expovariate(1.0 / mean_dwell))
+    return events
+
+
+def add_probe_arguments(parser):
+    # --replay / --synthetic / --log-dir, shared by tracker.py and daemon.py
+    parser.add_argument("--replay", help="JSONL file of [timestamp, pid, process_name, title]")
+    parser.add_argument("--synthetic", type=int, metavar="SWITCHES")
+    parser.add_argument("--apps", type=int, default=10, help="distinct apps in a --synthetic stream")
+    parser.add_argument("--log-dir", help="default: logs (required with --replay/--synthetic)")
+
+
+def probe_from_args(parser, args):
+    # the probe the options ask for; also fills in args.log_dir
+    if (args.replay or args.synthetic) and not args.log_dir:
+        # keep replayed data out of the real history in logs/
+        parser.error("--replay/--synthetic need an explicit --log-dir")
+    args.log_dir = args.log_dir or "logs"
+    if args.replay:
+        return ReplayProbe.from_file(args.replay)
+    if args.synthetic:
+        # shifted to end now, so the stream fills today and the days before it
+        events = synthetic_events(n_apps=args.apps, switches=args.synthetic)
+        shift = time.time() - events[-1][0]
+        return ReplayProbe([(t + shift, pid, name, title) for t, pid, name, title in events])
+    return Win32Probe()
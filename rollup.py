@@ -0,0 +1,125 @@
+import json
+import os
+import time
+from datetime import date, timedelta
+from history import HistoryCache, day_signature
+from logger import read_day, atomic_write
+
+# Weekly (ISO week) and monthly rollups of finalized days, stored as
+#   {"sources": {"YYYY-MM-DD": day_signature}, "totals": {app: seconds}}
+# A rollup is trusted only while every source day still has the recorded
+# signature; new days are folded in incrementally, a changed day forces a rebuild.
+
+
+def rollup_dir(log_dir):
+    return os.path.join(log_dir, "rollups")
+
+
+def week_key(day):
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(day):
+    return f"{day.year}-{day.month:02d}"
+
+
+def week_days(day):
+    monday = day - timedelta(days=day.weekday())
+    return [monday + timedelta(days=i) for i in range(7)]
+
+
+def month_days(day):
+    first = day.replace(day=1)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return [first + timedelta(days=i) for i in range((next_month - first).days)]
+
+
+def signature_json(signature):
+    # day_signature as stored in JSON (tuples become lists)
+    return [list(part) if part else None for part in signature]
+
+
+class RollupIndex:
+    def __init__(self, log_dir="logs"):
+        self.log_dir = log_dir
+        self.days = HistoryCache(log_dir)
+        self._rollups = {}
+        self._cached_key = None
+        self._cached_at = 0
+        self._cached = None
+
+    def finalize_day(self, day):
+        # called once a day's log will no longer grow
+        self._refresh(week_key(day), week_days(day), day)
+        self._refresh(month_key(day), month_days(day), day)
+
+    def range_totals(self, start, end):
+        # Covers [start, end] with whole months, then whole ISO weeks, then
+        # single days. end must be a finalized day (yesterday or earlier).
+        totals = {}
+        day = start
+        while day <= end:
+            month = month_days(day)
+            week = week_days(day)
+            if day == month[0] and month[-1] <= end:
+                part = self._refresh(month_key(day), month, end)
+                day = month[-1] + timedelta(days=1)
+            elif day == week[0] and week[-1] <= end:
+                part = self._refresh(week_key(day), week, end)
+                day = week[-1] + timedelta(days=1)
+            else:
+                part = self.days.day_totals(day)
+                day += timedelta(days=1)
+            for app, seconds in part.items():
+                totals[app] = totals.get(app, 0) + seconds
+        return totals
+
+    def past_totals(self, days, today=None, max_age=10):
+        # merged totals of the `days` full days before today, revalidated
+        # against the daily files at most every max_age seconds
+        today = today or date.today()
+        key = (today, days)
+        if key == self._cached_key and time.monotonic() - self._cached_at < max_age:
+            return self._cached
+        self._cached = self.range_totals(today - timedelta(days=days), today - timedelta(days=1))
+        self._cached_key = key
+        self._cached_at = time.monotonic()
+        return self._cached
+
+    def _path(self, key):
+        return os.path.join(rollup_dir(self.log_dir), f"{key}.json")
+
+    def _load(self, key):
+        rollup = self._rollups.get(key)
+        if rollup is None:
+            try:
+                with open(self._path(key), "r", encoding="utf-8") as f:
+                    rollup = json.load(f)
+            except (OSError, ValueError):
+                rollup = {"sources": {}, "totals": {}}
+            self._rollups[key] = rollup
+        return rollup
+
+    def _refresh(self, key, period, last_day):
+        days = [d for d in period if d <= last_day]
+        signatures = {str(d): signature_json(day_signature(self.log_dir, d)) for d in days}
+        rollup = self._load(key)
+        sources = rollup["sources"]
+
+        stale = any(sources[d] != signatures.get(d) for d in sources)
+        if stale:
+            rollup = {"sources": {}, "totals": {}}
+        missing = [d for d in days if str(d) not in rollup["sources"]]
+        if not stale and not missing:
+            return rollup["totals"]
+
+        totals = rollup["totals"]
+        for d in missing:
+            for app, seconds in read_day(self.log_dir, d).items():
+                totals[app] = totals.get(app, 0) + seconds
+            rollup["sources"][str(d)] = signatures[str(d)]
+        self._rollups[key] = rollup
+        os.makedirs(rollup_dir(self.log_dir), exist_ok=True)
+        atomic_write(self._path(key), json.dumps(rollup, ensure_ascii=False).encode("utf-8"))
+        return totals
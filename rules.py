@@ -0,0 +1,132 @@
+import re
+from collections import OrderedDict
+
+# Display-name rules over the foreground process and window title, stored in
+# display_rules.json as an ordered list:
+#   {"name": "JetBrains", "process": "idea64.exe|pycharm64.exe|*storm64.exe"}
+#   {"name": "YouTube", "process": "chrome.exe", "title": "* - YouTube - *"}
+#   {"name": "Docs", "title": "docs\\.python\\.org|MDN", "regex": true}
+# Globs (the default, "|" separates alternatives) must match the whole field;
+# regexes may match anywhere in it. A missing field matches anything, matching
+# is case-insensitive, and the first matching rule wins.
+
+FLAGS = re.IGNORECASE | re.MULTILINE
+
+
+def _glob(glob):
+    # like fnmatch.translate, but "*" and "?" stay within one field
+    out = []
+    for ch in glob:
+        if ch == "*":
+            out.append(r"[^\n]*")
+        elif ch == "?":
+            out.append(r"[^\n]")
+        else:
+            out.append(re.escape(ch))
+    return "".join(out)
+
+
+def _field_pattern(pattern, regex):
+    if not pattern:
+        return r"[^\n]*"
+    if regex:
+        return rf"[^\n]*?(?:{pattern})[^\n]*"
+    return "(?:" + "|".join(_glob(glob.strip()) for glob in pattern.split("|")) + ")"
+
+
+def compile_rule(rule):
+    # matched against "process\ntitle"
+    regex = bool(rule.get("regex"))
+    return _field_pattern(rule.get("process", ""), regex) + r"\n" + _field_pattern(rule.get("title", ""), regex) + "$"
+
+
+def valid_rules(rules):
+    # (rules that compile, error messages for the rest)
+    good, errors = [], []
+    for rule in rules:
+        if not rule.get("name") or not (rule.get("process") or rule.get("title")):
+            continue
+        try:
+            re.compile(compile_rule(rule), FLAGS)
+        except re.error as e:
+            errors.append(f"{rule['name']}: {e}")
+            continue
+        good.append(rule)
+    return good, errors
+
+
+def _key(rule):
+    return (rule.get("process", ""), rule.get("title", ""), bool(rule.get("regex")))
+
+
+class RuleEngine:
+    # Rules are compiled into one alternation of named groups, so a lookup is
+    # a single regex match whatever the rule count (regex rules with groups of
+    # their own are tried separately, in order); results are memoized per
+    # (process, title) as the index of the matching rule. update() swaps in a
+    # new (rules, matcher, separate, memo) tuple, which the tracker thread picks
+    # up on its next lookup; memo entries that an edit cannot affect are kept.
+    def __init__(self, rules=(), maxsize=4096):
+        self.maxsize = maxsize
+        self.errors = []
+        self.hits = 0
+        self.misses = 0
+        self._state = ((), None, (), OrderedDict())
+        self.update(rules)
+
+    def update(self, rules):
+        rules, self.errors = valid_rules(rules)
+        rules = tuple(dict(r) for r in rules)
+        old_rules, _, _, old_memo = self._state
+        # Lookups only depend on the patterns up to the first match, so entries
+        # that matched before the first changed pattern stay valid. A rename
+        # needs no invalidation at all because names are read at lookup time.
+        keep_below = 0
+        while (keep_below < min(len(rules), len(old_rules))
+               and _key(rules[keep_below]) == _key(old_rules[keep_below])):
+            keep_below += 1
+        memo = OrderedDict((k, i) for k, i in list(old_memo.items()) if i is not None and i < keep_below)
+
+        alternatives, separate = [], []
+        for i, rule in enumerate(rules):
+            pattern = re.compile(compile_rule(rule), FLAGS)
+            if pattern.groups:
+                # a regex rule's own groups and backreferences would clash with
+                # the other rules' once joined, so it is matched on its own
+                separate.append((i, pattern))
+            else:
+                alternatives.append(f"(?P<r{i}>{compile_rule(rule)})")
+        matcher = re.compile("|".join(alternatives), FLAGS) if alternatives else None
+        self._state = (rules, matcher, tuple(separate), memo)
+
+    def rules(self):
+        return [dict(r) for r in self._state[0]]
+
+    def match(self, process, title=""):
+        # display name of the first matching rule, or None
+        rules, matcher, separate, memo = self._state
+        if not rules:
+            return None
+        key = (process, title)
+        try:
+            index = memo[key]
+            memo.move_to_end(key)
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            text = process + "\n" + (title or "").replace("\n", " ")
+            m = matcher.match(text) if matcher is not None else None
+            index = int(m.lastgroup[1:]) if m else None
+            for i, pattern in separate:
+                if index is not None and i > index:
+                    break
+                if pattern.match(text):
+                    index = i
+                    break
+            memo[key] = index
+            if len(memo) > self.maxsize:
+                memo.popitem(last=False)
+        return rules[index]["name"] if index is not None else None
+
+    def stats(self):
+        return {"rules": len(self._state[0]), "hits": self.hits, "misses": self.misses, "size": len(self._state[3])}
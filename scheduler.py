@@ -0,0 +1,53 @@
+import time
+
+
+class AdaptiveScheduler:
+    # Decides when WindowTracker.track samples next.
+    #
+    # Polls every min_interval right after a switch, backs off geometrically
+    # while the foreground app stays the same, and drops to idle_interval once
+    # there has been no input for idle_after seconds. Since a switch is
+    # attributed to the midpoint between two samples, `accuracy` (the largest
+    # attribution error allowed while the user is active) caps the active
+    # interval at 2 * accuracy.
+    #
+    # Deadlines advance from the previous deadline rather than from "now", so
+    # time spent sampling does not accumulate as drift. clock and sleep are
+    # injectable, which lets replays and tests run on a fake clock.
+    def __init__(self, clock=time.monotonic, sleep=time.sleep, accuracy=1.0,
+                 min_interval=0.5, idle_interval=10.0, idle_after=60.0, backoff=1.5):
+        self.clock = clock
+        self._sleep = sleep
+        self.min_interval = min(min_interval, 2 * accuracy)
+        self.max_interval = 2 * accuracy
+        self.idle_interval = max(idle_interval, self.max_interval)
+        self.idle_after = idle_after
+        self.backoff = backoff
+        self.interval = self.min_interval
+        self.wakeups = 0
+        self._deadline = None
+
+    def now(self):
+        return self.clock()
+
+    def on_sample(self, switched, idle_seconds=0):
+        if switched:
+            self.interval = self.min_interval
+        elif idle_seconds >= self.idle_after:
+            self.interval = self.idle_interval
+        else:
+            self.interval = min(self.interval * self.backoff, self.max_interval)
+
+    def wait(self):
+        now = self.clock()
+        if self._deadline is None or self._deadline < now - self.interval:
+            # first run, or we fell badly behind (suspend, debugger): resync
+            self._deadline = now
+        self._deadline += self.interval
+        delay = self._deadline - now
+        if delay > 0:
+            self._sleep(delay)
+        self.wakeups += 1
+
+    def stats(self):
+        return {"wakeups": self.wakeups, "interval": self.interval}
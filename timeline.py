@@ -0,0 +1,191 @@
+import os
+import struct
+from array import array
+from datetime import date, datetime, timedelta
+
+# One record per foreground segment, packed little-endian:
+#   start (epoch seconds, float64), duration (seconds, float32), app id (uint16)
+# 14 bytes per segment, so even ~1,000 switches a day stays around 5 MB a year.
+SEGMENT_FORMAT = "<dfH"
+SEGMENT_SIZE = struct.calcsize(SEGMENT_FORMAT)
+SEGMENT_DTYPE = [("start", "<f8"), ("duration", "<f4"), ("app", "<u2")]
+MAX_APPS = 0xFFFF
+
+
+def timeline_dir(log_dir):
+    return os.path.join(log_dir, "timeline")
+
+
+def segments_path(log_dir, day):
+    return os.path.join(timeline_dir(log_dir), f"{day}.seg")
+
+
+def apps_path(log_dir, day):
+    # app dictionary: line N holds the name for app id N
+    return os.path.join(timeline_dir(log_dir), f"{day}.apps")
+
+
+def _read_apps(log_dir, day):
+    path = apps_path(log_dir, day)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8", newline="\n") as f:
+        # a name without its newline was cut short and no segment refers to it
+        return [line[:-1] for line in f if line.endswith("\n")]
+
+
+def _segment_count(path):
+    # a record cut short by a crash is ignored
+    try:
+        return os.path.getsize(path) // SEGMENT_SIZE
+    except OSError:
+        return 0
+
+
+class TimelineStore:
+    # Append-only columnar store for one day's segments. Columns are typed
+    # arrays with dictionary-encoded app ids; every append is also written
+    # through to the binary day file.
+    def __init__(self, log_dir="logs", day=None):
+        self.log_dir = log_dir
+        self.day = str(day or date.today())
+        self.apps = _read_apps(log_dir, self.day)
+        self._ids = {app: i for i, app in enumerate(self.apps)}
+        self.starts = array("d")
+        self.durations = array("f")
+        self.app_ids = array("H")
+        self._segments_file = None
+        self._apps_file = None
+        self._load()
+
+    def _load(self):
+        path = apps_path(self.log_dir, self.day)
+        size = sum(len(app.encode("utf-8")) + 1 for app in self.apps)
+        if os.path.exists(path) and os.path.getsize(path) != size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+        path = segments_path(self.log_dir, self.day)
+        count = _segment_count(path)
+        if not count:
+            return
+        with open(path, "rb") as f:
+            raw = f.read(count * SEGMENT_SIZE)
+        for start, duration, app_id in struct.iter_unpack(SEGMENT_FORMAT, raw):
+            self.starts.append(start)
+            self.durations.append(duration)
+            self.app_ids.append(app_id)
+        # drop a torn trailing record so new appends stay aligned
+        if os.path.getsize(path) != count * SEGMENT_SIZE:
+            with open(path, "r+b") as f:
+                f.truncate(count * SEGMENT_SIZE)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def app_id(self, app):
+        app_id = self._ids.get(app)
+        if app_id is None:
+            if len(self.apps) >= MAX_APPS:
+                raise OverflowError("too many distinct apps in one day")
+            app_id = len(self.apps)
+            self._open()
+            # the name must be on disk before any segment refers to it
+            self._apps_file.write(app.replace("\n", " ") + "\n")
+            self._apps_file.flush()
+            self.apps.append(app)
+            self._ids[app] = app_id
+        return app_id
+
+    def append(self, start, end, app, flush=True):
+        app_id = self.app_id(app)
+        duration = end - start
+        # on disk first: a failed write leaves the columns untouched for a retry
+        self._open()
+        self._segments_file.write(struct.pack(SEGMENT_FORMAT, start, duration, app_id))
+        if flush:
+            self._segments_file.flush()
+        self.starts.append(start)
+        self.durations.append(duration)
+        self.app_ids.append(app_id)
+
+    def flush(self):
+        if self._segments_file is not None:
+            self._segments_file.flush()
+
+    def close(self):
+        for f in (self._segments_file, self._apps_file):
+            if f is not None:
+                f.close()
+        self._segments_file = None
+        self._apps_file = None
+
+    def _open(self):
+        if self._segments_file is None:
+            os.makedirs(timeline_dir(self.log_dir), exist_ok=True)
+            self._apps_file = open(apps_path(self.log_dir, self.day), "a", encoding="utf-8", newline="\n")
+            self._segments_file = open(segments_path(self.log_dir, self.day), "ab")
+
+
+def load_day(log_dir, day):
+    # (apps, segments): segments is a read-only memory-mapped structured array
+    import numpy as np
+    apps = _read_apps(log_dir, day)
+    path = segments_path(log_dir, day)
+    count = _segment_count(path)
+    if not count:
+        return apps, np.empty(0, dtype=SEGMENT_DTYPE)
+    return apps, np.memmap(path, dtype=SEGMENT_DTYPE, mode="r", shape=(count,))
+
+
+def load_range(log_dir, start, end):
+    # Concatenates [start, end] into one array with a shared app dictionary.
+    import numpy as np
+    ids = {}
+    parts = []
+    day = start
+    while day <= end:
+        day_apps, segments = load_day(log_dir, day)
+        if len(segments):
+            remap = np.array([ids.setdefault(app, len(ids)) for app in day_apps], dtype=np.uint16)
+            part = np.array(segments)
+            part["app"] = remap[part["app"]]
+            parts.append(part)
+        day += timedelta(days=1)
+    apps = sorted(ids, key=ids.get)
+    if not parts:
+        return apps, np.empty(0, dtype=SEGMENT_DTYPE)
+    return apps, np.concatenate(parts)
+
+
+def hourly_totals(segments, n_apps):
+    # seconds per (app, local hour of day), splitting segments at hour boundaries
+    import numpy as np
+    totals = np.zeros((n_apps, 24))
+    if not len(segments):
+        return totals
+    offset = datetime.fromtimestamp(float(segments["start"][0])).astimezone().utcoffset().total_seconds()
+    cursor = segments["start"].astype(np.float64) + offset
+    end = cursor + segments["duration"]
+    apps = segments["app"].astype(np.intp)
+    # each pass consumes up to the next hour boundary of every unfinished segment
+    while True:
+        active = cursor < end
+        if not active.any():
+            break
+        hour = np.floor(cursor / 3600)
+        piece_end = np.minimum((hour + 1) * 3600, end)
+        np.add.at(totals, (apps[active], (hour[active] % 24).astype(np.intp)), (piece_end - cursor)[active])
+        cursor = np.where(active, piece_end, cursor)
+    return totals
+
+
+def switch_rate(segments):
+    # context switches per hour of tracked time
+    total = float(segments["duration"].sum()) if len(segments) else 0.0
+    return len(segments) / (total / 3600) if total else 0.0
+
+
+def focus_streaks(segments, min_seconds=25 * 60):
+    # segments (as a boolean mask) long enough to count as a focused stretch
+    return segments["duration"] >= min_seconds
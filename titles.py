@@ -0,0 +1,175 @@
+import argparse
+import json
+import os
+from datetime import date
+from logger import atomic_write
+
+# Per-window-title time under each app, in bounded memory. Each app keeps a
+# Space-Saving sketch of at most TOP_K titles: any title that gets more than
+# 1/TOP_K of the app's time is guaranteed to be in it, and a counter's
+# `error` bounds how much of its count may belong to titles it replaced.
+# Only the guaranteed part (count - error) is reported per title; the rest of
+# the app's time is reported as "other", so the parts always add up to the
+# app total. Titles are interned while some sketch holds them and written
+# dictionary-encoded to logs/titles/{day}.json:
+#   {"titles": [title, ...], "apps": {app: {"top": [[title_id, seconds, error], ...], "total": s}}}
+
+TOP_K = 32
+
+
+def titles_dir(log_dir):
+    return os.path.join(log_dir, "titles")
+
+
+def titles_path(log_dir, day):
+    return os.path.join(titles_dir(log_dir), f"{day}.json")
+
+
+class TitleTable:
+    # title <-> small int, reference counted so ids of evicted titles are reused
+    def __init__(self):
+        self.ids = {}
+        self.titles = []
+        self.refs = []
+        self._free = []
+
+    def acquire(self, title):
+        tid = self.ids.get(title)
+        if tid is None:
+            if self._free:
+                tid = self._free.pop()
+                self.titles[tid] = title
+                self.refs[tid] = 0
+            else:
+                tid = len(self.titles)
+                self.titles.append(title)
+                self.refs.append(0)
+            self.ids[title] = tid
+        self.refs[tid] += 1
+        return tid
+
+    def release(self, tid):
+        self.refs[tid] -= 1
+        if self.refs[tid] == 0:
+            del self.ids[self.titles[tid]]
+            self.titles[tid] = None
+            self._free.append(tid)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class SpaceSaving:
+    # weighted Space-Saving over title ids: {tid: [count, error]}
+    def __init__(self, table, capacity=TOP_K):
+        self.table = table
+        self.capacity = capacity
+        self.counters = {}
+        self.total = 0.0
+
+    def add(self, title, seconds):
+        self.total += seconds
+        tid = self.table.ids.get(title)
+        counter = self.counters.get(tid) if tid is not None else None
+        if counter is not None:
+            counter[0] += seconds
+            return
+        if len(self.counters) < self.capacity:
+            self.counters[self.table.acquire(title)] = [seconds, 0.0]
+            return
+        # replace the smallest counter; the newcomer inherits its count as error
+        victim = min(self.counters, key=lambda k: self.counters[k][0])
+        floor = self.counters.pop(victim)[0]
+        self.table.release(victim)
+        self.counters[self.table.acquire(title)] = [floor + seconds, floor]
+
+    def top(self):
+        # [(title, guaranteed seconds, error)], largest first
+        titles = self.table.titles
+        rows = [(titles[tid], count - error, error) for tid, (count, error) in self.counters.items()]
+        return sorted(rows, key=lambda r: r[1], reverse=True)
+
+    def other(self):
+        return max(0.0, self.total - sum(count - error for count, error in self.counters.values()))
+
+
+class TitleTracker:
+    def __init__(self, log_dir="logs", day=None, capacity=TOP_K):
+        self.log_dir = log_dir
+        self.day = day or date.today().isoformat()
+        self.capacity = capacity
+        self.table = TitleTable()
+        self.apps = {}
+        # changed since the last save
+        self.dirty = False
+        self._load()
+
+    def add(self, app, title, seconds):
+        if seconds <= 0 or app is None:
+            return
+        sketch = self.apps.get(app)
+        if sketch is None:
+            sketch = self.apps[app] = SpaceSaving(self.table, self.capacity)
+        sketch.add(title or "", seconds)
+        self.dirty = True
+
+    def top(self, app):
+        sketch = self.apps.get(app)
+        return (sketch.top(), sketch.other()) if sketch else ([], 0.0)
+
+    def save(self):
+        if not self.apps:
+            return
+        # compact the id space on disk: only ids still in use, renumbered
+        titles = []
+        remap = {}
+        apps = {}
+        for app, sketch in self.apps.items():
+            top = []
+            for tid, (count, error) in sketch.counters.items():
+                if tid not in remap:
+                    remap[tid] = len(titles)
+                    titles.append(self.table.titles[tid])
+                top.append([remap[tid], round(count, 3), round(error, 3)])
+            apps[app] = {"top": top, "total": round(sketch.total, 3)}
+        os.makedirs(titles_dir(self.log_dir), exist_ok=True)
+        raw = json.dumps({"titles": titles, "apps": apps}, ensure_ascii=False, separators=(",", ":"))
+        atomic_write(titles_path(self.log_dir, self.day), raw.encode("utf-8"))
+        self.dirty = False
+
+    def _load(self):
+        data = load_day(self.log_dir, self.day)
+        titles = data.get("titles", [])
+        for app, entry in data.get("apps", {}).items():
+            sketch = self.apps[app] = SpaceSaving(self.table, self.capacity)
+            for tid, count, error in entry["top"][:self.capacity]:
+                sketch.counters[self.table.acquire(titles[tid])] = [count, error]
+            sketch.total = entry["total"]
+
+
+def load_day(log_dir, day):
+    try:
+        with open(titles_path(log_dir, day), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--log-dir", default="logs")
+    parser.add_argument("--day", default=date.today().isoformat())
+    parser.add_argument("--app", help="only this app")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    tracker = TitleTracker(args.log_dir, args.day)
+    apps = sorted(tracker.apps.items(), key=lambda x: x[1].total, reverse=True)
+    for app, sketch in apps:
+        if args.app and app != args.app:
+            continue
+        print(f"{sketch.total / 60:8.1f}m  {app}")
+        for title, seconds, error in sketch.top()[:args.top]:
+            bound = f" (+{error / 60:.1f}m?)" if error else ""
+            print(f"    {seconds / 60:8.1f}m{bound}  {title}")
+        print(f"    {sketch.other() / 60:8.1f}m  (その他)")
@@ -1,50 +1,239 @@
-import win32gui, win32process, psutil, time
+import argparse
+from collections import namedtuple
+from datetime import date, timedelta
+from types import MappingProxyType
 from logger import Logger
+from flusher import LogFlusher, next_midnight
+from probe import Win32Probe, add_probe_arguments, probe_from_args
+from scheduler import AdaptiveScheduler
+from rules import RuleEngine
+from config import shared_store
+from perfstats import STATS, now_ns
+
+# Immutable view handed to other threads. totals holds committed seconds only;
+# the running segment is (current_app, current_start) on the monotonic clock.
+# changes holds (version, apps whose total changed) for the last
+# CHANGE_HISTORY versions; apps is None when any total may have changed.
+Snapshot = namedtuple("Snapshot", ["version", "totals", "current_app", "current_start", "changes"], defaults=((),))
+CHANGE_HISTORY = 64
+
+
+def changed_apps(snapshot, since):
+    # apps whose committed total changed after version `since`, or None when
+    # that cannot be told from the snapshot (too old, or a full change)
+    if since is None or not 0 <= snapshot.version - since <= len(snapshot.changes):
+        return None
+    apps = set()
+    for version, changed in snapshot.changes:
+        if version > since:
+            if changed is None:
+                return None
+            apps.update(changed)
+    return apps
+
 
 class WindowTracker:
-    def __init__(self):
+    def __init__(self, probe=None, logger=None, scheduler=None, config=None):
+        self.probe = probe if probe is not None else Win32Probe()
+        self.scheduler = scheduler or AdaptiveScheduler(clock=self.probe.monotonic, sleep=self.probe.sleep)
         self.current_app = None
-        self.start_time = time.time()
-        self.logger = Logger()
+        # durations are measured on the monotonic clock; wall time is only
+        # used to place segments on the timeline
+        self.start_time = self.scheduler.now()
+        self.start_wall = self.probe.time()
+        self.logger = logger if logger is not None else Logger()
+        # the day follows the probe's clock, so a replay lands on its recorded dates
+        day = date.fromtimestamp(self.start_wall).isoformat()
+        if self.logger.today != day:
+            self.logger = self.logger.for_day(day)
         self.log = self.logger.load_log()
-        self.name_map = self.logger.load_name_map()
+        # self.log holds self.day only; at local midnight the running segment
+        # is cut and a new day starts (see _rollover)
+        self.day = self.logger.today
+        self._next_midnight = next_midnight(self.start_wall)
+        # all disk writes happen on the flusher thread
+        self.flusher = LogFlusher(self.logger)
+        self.current_title = None
+        self.title_start = self.start_time
+        self.active_title = None
+        # display names and rules come from the shared in-memory config and
+        # are swapped in by reference when it changes
+        self.config = config or shared_store()
+        self.name_map = self.config.get("name_map")
+        self.rules = RuleEngine(self.config.get("rules"))
+        self.config.subscribe(self._on_config_changed)
         self._running = True
+        self._snapshot = Snapshot(0, MappingProxyType(dict(self.log)), None, None)
 
     def get_log(self):
-        return self.log
+        return self._snapshot.totals
+
+    def get_snapshot(self):
+        return self._snapshot
+
+    def changed_since(self, version):
+        return self._snapshot.version != version
+
+    def running_seconds(self, snapshot=None):
+        # not-yet-committed duration of the current app
+        snapshot = snapshot or self._snapshot
+        if not snapshot.current_app:
+            return 0
+        return max(0, self.scheduler.now() - snapshot.current_start)
+
+    def live_totals(self, snapshot=None):
+        snapshot = snapshot or self._snapshot
+        totals = dict(snapshot.totals)
+        if snapshot.current_app:
+            totals[snapshot.current_app] = totals.get(snapshot.current_app, 0) + self.running_seconds(snapshot)
+        return totals
+
+    def _publish(self, changed=None):
+        # only the tracker thread writes self.log; readers get a fresh copy
+        # swapped in with a single reference assignment
+        version = self._snapshot.version + 1
+        changes = self._snapshot.changes[-(CHANGE_HISTORY - 1):] + ((version, changed),)
+        self._snapshot = Snapshot(
+            version,
+            MappingProxyType(dict(self.log)),
+            self.current_app,
+            self.start_time,
+            changes,
+        )
 
     def get_name_map(self):
         return self.name_map
 
     def set_name_map(self, new_map):
-        self.name_map = new_map
-        self.logger.save_name_map(new_map)
+        self.config.set("name_map", new_map)
+
+    def get_rules(self):
+        return self.rules.rules()
+
+    def set_rules(self, rules):
+        self.config.set("rules", rules)
+
+    def _on_config_changed(self, key, value):
+        if key == "name_map":
+            self.name_map = value
+        elif key == "rules":
+            self.rules.update(value)
+
+    def get_probe_stats(self):
+        return self.probe.stats()
 
     def stop(self):
+        # wakes the tracker thread so track() returns (and flushes) promptly
         self._running = False
+        self.probe.wake()
 
     def get_active_app_name(self):
-        hwnd = win32gui.GetForegroundWindow()
         try:
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
-            process_name = process.name()
-            return self.name_map.get(process_name, process_name)
+            started = now_ns()
+            sample = self.probe.sample()
+            STATS.record("probe.sample", now_ns() - started)
+            process_name = sample.process_name
+            self.active_title = sample.title
+            # ルール（プロセス名・タイトル）→ 表示名の完全一致 → プロセス名 の順
+            return (self.rules.match(process_name, sample.title)
+                    or self.name_map.get(process_name, process_name))
         except Exception:
+            self.active_title = None
             return "Unknown"
 
+    def _commit(self, at, wall_at):
+        duration = at - self.start_time
+        self.log[self.current_app] = self.log.get(self.current_app, 0) + duration
+        self.flusher.segment(self.day, self.current_app, duration, self.start_wall, wall_at)
+
+    def _rollover(self, now, wall):
+        # cut the running segment at each midnight passed since the last
+        # sample, so every part lands in its own day's partition
+        while wall >= self._next_midnight:
+            midnight = self._next_midnight
+            at = max(self.start_time, now - (wall - midnight))
+            if self.current_app:
+                self.flusher.title(self.day, self.current_app, self.current_title, at - self.title_start)
+                self._commit(at, midnight)
+            self.day = (date.fromisoformat(self.day) + timedelta(days=1)).isoformat()
+            self._next_midnight = next_midnight(midnight)
+            self.log = {}
+            self.start_time = self.title_start = at
+            self.start_wall = midnight
+            self.flusher.rollover(self.day)
+        self._publish()
+
+    def _close_segment(self):
+        # commit the running segment so stopping loses nothing
+        now = self.scheduler.now()
+        wall = self.probe.time()
+        if wall >= self._next_midnight:
+            self._rollover(now, wall)
+        if self.current_app:
+            self.flusher.title(self.day, self.current_app, self.current_title, now - self.title_start)
+            self._commit(now, wall)
+            committed, self.current_app = self.current_app, None
+            self._publish((committed,))
+
     def track(self):
+        scheduler = self.scheduler
+        last_sample = scheduler.now()
         try:
-            while self._running:
+            while self._running and not self.probe.finished():
                 active_app = self.get_active_app_name()
-                if active_app != self.current_app:
-                    now = time.time()
+                title = self.active_title
+                now = scheduler.now()
+                wall = self.probe.time()
+                if wall >= self._next_midnight:
+                    self._rollover(now, wall)
+                switched = active_app != self.current_app
+                if switched or title != self.current_title:
+                    # the switch happened somewhere since the previous sample;
+                    # splitting the gap halves the worst-case attribution error
+                    at = max((last_sample + now) / 2, self.start_time) if self.current_app else now
                     if self.current_app:
-                        duration = now - self.start_time
-                        self.log[self.current_app] = self.log.get(self.current_app, 0) + duration
-                        self.logger.save_log(self.log)
+                        self.flusher.title(self.day, self.current_app, self.current_title, at - self.title_start)
+                    self.current_title = title
+                    self.title_start = at
+                if switched:
+                    wall_at = wall - (now - at)
+                    committed = ()
+                    if self.current_app:
+                        self._commit(at, wall_at)
+                        committed = (self.current_app,)
                     self.current_app = active_app
-                    self.start_time = now
-                time.sleep(1)
+                    self.start_time = at
+                    self.start_wall = wall_at
+                    self._publish(committed)
+                last_sample = now
+                scheduler.on_sample(switched, self.probe.idle_seconds())
+                scheduler.wait()
         except KeyboardInterrupt:
             print("Tracker stopped.")
+        finally:
+            self._close_segment()
+            self.flusher.stop()
+            # the shared store would otherwise keep this tracker alive
+            self.config.unsubscribe(self._on_config_changed)
+            self.config.flush()
+
+if __name__ == "__main__":
+    # Headless run against a recorded or synthetic stream, e.g. on Linux:
+    #   python tracker.py --synthetic 5000 --log-dir /tmp/logs
+    parser = argparse.ArgumentParser()
+    add_probe_arguments(parser)
+    parser.add_argument("--accuracy", type=float, default=1.0, help="max attribution error in seconds")
+    args = parser.parse_args()
+    probe = probe_from_args(parser, args)
+    scheduler = AdaptiveScheduler(clock=probe.monotonic, sleep=probe.sleep, accuracy=args.accuracy)
+    tracker = WindowTracker(probe=probe, logger=Logger(log_dir=args.log_dir), scheduler=scheduler)
+    tracker.track()
+    print(f"wakeups: {scheduler.wakeups}")
+    # totals over every day the run touched, not just the last partition
+    totals = {}
+    days = tracker.logger.iter_days(date.fromisoformat(tracker.logger.today), date.fromisoformat(tracker.day))
+    for day, day_totals in days:
+        for app, seconds in day_totals.items():
+            totals[app] = totals.get(app, 0) + seconds
+    for app, seconds in sorted(totals.items(), key=lambda x: x[1], reverse=True):
+        print(f"{seconds:10.0f}s  {app}")